@@ -1,15 +1,35 @@
 # src/content_enricher.py
 import os
-import json
+import re
 import time
+import orjson
 import logging
-from typing import Dict, Optional
+import threading
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+from requests_cache import CachedSession
+from lxml import etree
+from lxml.cssselect import CSSSelector
 from urllib.parse import urlparse
-from utils import load_config, setup_logging
+from utils import load_config, setup_logging, atomic_write_bytes
 from model_initializer import initialize_model
-from langchain.schema import HumanMessage
+from langchain.schema import BaseMessage, HumanMessage, SystemMessage
+
+# Static instructions go first as a byte-identical system message so the provider can reuse
+# the cached prompt prefix across articles
+ANALYSIS_SYSTEM_MESSAGE = SystemMessage(content=(
+    "Pateik glaustą ir informatyvią straipsnio santrauką (apie 150 žodžių), "
+    "išryškindamas svarbiausius faktus ir įžvalgas. "
+    "Santrauka turi būti aiški, nuosekli ir apimti esminius straipsnio aspektus."
+))
+
+# Selector features whose result can change as later siblings are parsed
+STREAM_UNSAFE_SELECTOR = re.compile(r'[:+~]')
 
 class ContentEnricher:
     def __init__(self, config_path: str):
@@ -36,46 +56,201 @@ class ContentEnricher:
             temperature=ai_config.get("temperature", {}).get("analysis", 0.3),
             provider=ai_config.get("provider", "openai")
         )
+
+        # One pooled keep-alive session so TLS handshakes are paid per domain, not per article
+        self.session = self.create_session()
+        # The HTTP cache reads and stores the whole body before handing out the first chunk, so
+        # pages are only streamed (and their download cut short) when the cache is off
+        self.stream_pages = not self.enrichment_config.get("http_cache_days")
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept': 'text/html,*/*;q=0.8',
+            # urllib3 only advertises br when a Brotli decoder is installed and decompresses transparently
+            'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding']
+        })
+        adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=32,
+            max_retries=Retry(total=self.enrichment_config.get("max_retries", 3), backoff_factor=0.5)
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # Earliest monotonic time at which each domain may be requested again
+        self.next_fetch_at = {}
+        self.rate_limit_lock = threading.Lock()
+
+        # Selectors are compiled once per configured domain rather than on every fetch, together
+        # with whether a match can be accepted before the rest of the page is parsed: pseudo-classes
+        # (:last-child, :nth-of-type, ...) and sibling combinators depend on elements that may not
+        # have arrived yet, so such selectors are only evaluated on the complete page
+        self.selectors = {
+            domain: (
+                CSSSelector(source_config["selector"], translator='html'),
+                not STREAM_UNSAFE_SELECTOR.search(source_config["selector"])
+            )
+            for domain, source_config in self.enrichment_config.get("sources", {}).items()
+        }
         
+    def create_session(self) -> requests.Session:
+        cache_days = self.enrichment_config.get("http_cache_days")
+        if not cache_days:
+            return requests.Session()
+        # On-disk cache so re-runs revalidate article pages (ETag / Last-Modified) instead of
+        # downloading them again; only successful responses are stored
+        return CachedSession(
+            os.path.join(self.base_folder, "enrich_http_cache"),
+            backend='sqlite',
+            expire_after=timedelta(days=cache_days),
+            cache_control=True,
+            allowable_codes=(200,)
+        )
+
     def get_full_content(self, url: str) -> Optional[str]:
         domain = urlparse(url).netloc
-        source_config = self.enrichment_config["sources"].get(domain)
-        
-        if not source_config:
+        if domain not in self.selectors:
             logging.warning(f"No scraping configuration found for domain: {domain}")
             return None
+        selector, streamable = self.selectors[domain]
 
         try:
-            response = requests.get(url, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            content_div = soup.select_one(source_config["selector"])
-            
-            if content_div:
-                return content_div.get_text(strip=True)
-            else:
-                logging.warning(f"Content selector not found for URL: {url}")
-                return None
+            # Feed the body to the parser in chunks and, where the selector allows it, stop as soon
+            # as the first match in document order has closed; when streaming, the rest of the page
+            # is not downloaded either
+            with self.session.get(url, timeout=(5, 20), stream=self.stream_pages) as response:
+                response.raise_for_status()
+                # Raw bytes go straight to libxml2, which sniffs <meta charset>; a charset from the
+                # Content-Type header takes precedence. This avoids requests' full-body charset detection
+                parser = etree.HTMLPullParser(
+                    events=('end',) if streamable else (),
+                    encoding=self.declared_encoding(response)
+                )
+                for chunk in response.iter_content(chunk_size=8192):
+                    parser.feed(chunk)
+                    if streamable:
+                        content = self.find_content(parser, selector)
+                        if content is not None:
+                            return content
+                root = parser.close()
+                matches = selector(root) if root is not None else []
+                if matches:
+                    return self.extract_text(matches[0])
+
+            logging.warning(f"Content selector not found for URL: {url}")
+            return None
 
         except Exception as e:
             logging.error(f"Error fetching content from {url}: {e}")
             return None
 
+    def declared_encoding(self, response: requests.Response) -> Optional[str]:
+        # requests reports ISO-8859-1 for any text/* response without a charset, so only trust
+        # the header when it names one explicitly
+        if 'charset=' not in response.headers.get('Content-Type', '').lower():
+            return None
+        return requests.utils.get_encoding_from_headers(response.headers)
+
+    def find_content(self, parser: etree.HTMLPullParser, selector: CSSSelector) -> Optional[str]:
+        for _, element in parser.read_events():
+            if not selector(element):
+                continue
+            # The first match in document order is either inside this closed element, before it
+            # (and closed), or one of its still-open ancestors; in the last case it is not
+            # complete yet, so keep parsing until it closes
+            first_match = selector(element.getroottree().getroot())[0]
+            if any(ancestor is first_match for ancestor in element.iterancestors()):
+                continue
+            return self.extract_text(first_match)
+        return None
+
+    def extract_text(self, content: etree._Element) -> str:
+        etree.strip_elements(content, 'script', 'style', with_tail=False)
+        return ''.join(text.strip() for text in content.itertext())
+
+    def wait_for_domain(self, domain: str) -> None:
+        # Rate limiting: requests to the same domain start at least scraping_delay seconds apart,
+        # while other domains are not held up
+        delay = self.enrichment_config.get("scraping_delay", 2)
+        with self.rate_limit_lock:
+            now = time.monotonic()
+            slot = max(now, self.next_fetch_at.get(domain, now))
+            self.next_fetch_at[domain] = slot + delay
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _fetch_with_rate_limit(self, url: str) -> Optional[str]:
+        self.wait_for_domain(urlparse(url).netloc)
+        return self.get_full_content(url)
+
+    def fetch_full_contents(self, items: List[Dict]) -> Iterator[Tuple[Dict, Optional[str]]]:
+        # Bucket articles by domain so every site gets its own bounded pool of workers
+        by_domain = {}
+        for item in items:
+            by_domain.setdefault(urlparse(item['id']).netloc, []).append(item)
+
+        max_workers = self.enrichment_config.get("max_workers", 4)
+        executors = []
+        futures = {}
+        try:
+            for domain_items in by_domain.values():
+                executor = ThreadPoolExecutor(max_workers=min(max_workers, len(domain_items)))
+                executors.append(executor)
+                for item in domain_items:
+                    futures[executor.submit(self._fetch_with_rate_limit, item['id'])] = item
+
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+    def build_analysis_messages(self, title: str, content: str) -> List[BaseMessage]:
+        return [
+            ANALYSIS_SYSTEM_MESSAGE,
+            HumanMessage(content=f"Straipsnio pavadinimas: {title}\n\nTurinys: {content}")
+        ]
+
     def generate_article_analysis(self, title: str, content: str) -> str:
-        prompt = (
-            "Pateik glaustą ir informatyvią straipsnio santrauką (apie 150 žodžių), "
-            "išryškindamas svarbiausius faktus ir įžvalgas. "
-            "Santrauka turi būti aiški, nuosekli ir apimti esminius straipsnio aspektus.\n\n"
-            f"Straipsnio pavadinimas: {title}\n\n"
-            f"Turinys: {content}"
-        )
-        
-        response = self.model.invoke([HumanMessage(content=prompt)])
+        response = self.model.invoke(self.build_analysis_messages(title, content))
         return response.content
 
+    def generate_article_analyses(self, articles: List[Tuple[Dict, str]]) -> Iterator[Tuple[Dict, Any]]:
+        # The model client runs up to llm_concurrency requests at once and yields each result as
+        # soon as it completes, so callers can record it before the rest of the batch finishes;
+        # failed requests come back as exceptions instead of aborting the whole batch
+        messages = [self.build_analysis_messages(item['title'], content) for item, content in articles]
+        for index, analysis in self.model.batch_as_completed(
+            messages,
+            config={"max_concurrency": self.enrichment_config.get("llm_concurrency", 8)},
+            return_exceptions=True
+        ):
+            yield articles[index][0], analysis
+
+    def load_enrichment_sidecar(self, sidecar_file: str) -> Dict[str, Dict]:
+        updates = {}
+        if not os.path.exists(sidecar_file):
+            return updates
+        with open(sidecar_file, 'rb') as f:
+            for line in f:
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # A partially written last line from an interrupted run
+                    continue
+                updates.setdefault(record.pop('id'), {}).update(record)
+        return updates
+
+    def append_enrichment_record(self, sidecar, record: Dict) -> None:
+        sidecar.write(orjson.dumps(record) + b'\n')
+        sidecar.flush()
+        os.fsync(sidecar.fileno())
+
+    def save_enriched_news(self, weekly_file: str, sidecar_file: str, news_items: List[Dict]) -> None:
+        if not os.path.exists(sidecar_file):
+            return
+        atomic_write_bytes(weekly_file, orjson.dumps(news_items, option=orjson.OPT_INDENT_2))
+        os.remove(sidecar_file)
+
     def enrich_weekly_news(self, year: int, week: int) -> None:
         if not self.enrichment_config.get("enabled", False):
             return
@@ -85,46 +260,57 @@ class ContentEnricher:
             logging.error(f"Weekly news file not found: {weekly_file}")
             return
 
-        with open(weekly_file, 'r') as f:
-            news_items = json.load(f)
+        with open(weekly_file, 'rb') as f:
+            news_items = orjson.loads(f.read())
+
+        id_index = {item['id']: i for i, item in enumerate(news_items)}
+
+        # Results are journaled to a small JSON-Lines sidecar as they arrive and merged into the
+        # weekly file once at the end; a sidecar left behind by an interrupted run is replayed here
+        sidecar_file = f"{weekly_file}.enrich.jsonl"
+        for item_id, update in self.load_enrichment_sidecar(sidecar_file).items():
+            if item_id in id_index:
+                news_items[id_index[item_id]].update(update)
 
         to_process = [item for item in news_items 
                      if 'ai_summary' not in item 
                      and 'ai_summary_failed' not in item]
         
         if not to_process:
+            self.save_enriched_news(weekly_file, sidecar_file, news_items)
             return
 
+        logging.info(f"Found {len(to_process)} articles to process")
         processed = 0
         failed = 0
         
-        for item in to_process:
-            # Get full content and generate summary
-            full_content = self.get_full_content(item['id'])
-            if full_content:
-                ai_analysis = self.generate_article_analysis(item['title'], full_content)
-                
-                # Update the article in news_items
-                for i, news_item in enumerate(news_items):
-                    if news_item['id'] == item['id']:
-                        news_items[i]['ai_summary'] = ai_analysis
-                        break
-                
-                processed += 1
-            else:
-                # Mark the article as failed
-                for i, news_item in enumerate(news_items):
-                    if news_item['id'] == item['id']:
-                        news_items[i]['ai_summary_failed'] = True
-                        break
-                failed += 1
-            
-            # Save after each article (success or failure)
-            with open(weekly_file, 'w', encoding='utf-8') as f:
-                json.dump(news_items, f, ensure_ascii=False, indent=4)
-                
-            # Rate limiting
-            time.sleep(self.enrichment_config.get("scraping_delay", 2))
+        with open(sidecar_file, 'ab') as sidecar:
+            # Pages are fetched concurrently, then summarized in a single batched model call whose
+            # results are journaled one by one as each request completes
+            fetched = []
+            for item, full_content in self.fetch_full_contents(to_process):
+                if full_content:
+                    fetched.append((item, full_content))
+                else:
+                    # Mark the article as failed
+                    news_items[id_index[item['id']]]['ai_summary_failed'] = True
+                    self.append_enrichment_record(sidecar, {'id': item['id'], 'ai_summary_failed': True})
+                    failed += 1
+
+            if fetched:
+                for item, analysis in self.generate_article_analyses(fetched):
+                    news_item = news_items[id_index[item['id']]]
+                    if isinstance(analysis, Exception):
+                        logging.error(f"Error generating analysis for {item['id']}: {analysis}")
+                        news_item['ai_summary_failed'] = True
+                        self.append_enrichment_record(sidecar, {'id': item['id'], 'ai_summary_failed': True})
+                        failed += 1
+                    else:
+                        news_item['ai_summary'] = analysis.content
+                        self.append_enrichment_record(sidecar, {'id': item['id'], 'ai_summary': analysis.content})
+                        processed += 1
+
+        self.save_enriched_news(weekly_file, sidecar_file, news_items)
 
         logging.info(f"Enrichment complete. Successfully processed {processed} articles, {failed} failed")
 
@@ -146,15 +332,6 @@ def main(config_path: str):
     current_date = datetime.now()
     year, week, _ = current_date.isocalendar()
     
-    weekly_file = os.path.join(enricher.base_folder, f"news_{year}_{week:02}.json")
-    
-    if os.path.exists(weekly_file):
-        with open(weekly_file, 'r') as f:
-            news_items = json.load(f)
-            unenriched = len([item for item in news_items 
-                            if 'ai_summary' not in item 
-                            and 'ai_summary_failed' not in item])
-    
     enricher.enrich_weekly_news(year, week)
 
 def parse_arguments():
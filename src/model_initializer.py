@@ -1,46 +1,59 @@
 # src/model_initializer.py
 import os
-from dotenv import load_dotenv
+import threading
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, ClassVar, Mapping, Optional
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_google_genai import ChatGoogleGenerativeAI
+from utils import load_env_once
+
+# Static model settings, built once at import and shared read-only by every caller
+MODEL_CONFIGS: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    'openai': {
+        'basic': {"model": "gpt-4o-mini"},
+        'advanced': {"model": "gpt-4o"},
+        'embeddings': {
+            "model": "text-embedding-3-small",
+            "dimensions": 1536
+        }
+    },
+    'gemini': {
+        'basic': {"model": "gemini-1.5-pro"},
+        'advanced': {"model": "gemini-2.0-flash-exp"},
+        'embeddings': {
+            "model": "text-embedding-004",
+            "dimensions": 768
+        }
+    }
+})
 
 class ModelManager:
-    def __init__(self):
-        load_dotenv(override=True)
-        
-        # Initialize OpenAI
-        openai_api_key = os.getenv("OPENAI_API_KEY")
-        if openai_api_key:  # Only set if not None
-            os.environ["OPENAI_API_KEY"] = openai_api_key
+    # Process-wide singleton: .env is parsed once, however many
+    # times initialize_model() is called
+    _instance: ClassVar[Optional["ModelManager"]] = None
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._setup()
+                    cls._instance = instance
+        return cls._instance
+
+    def _setup(self):
+        load_env_once()
         
-        # Initialize Gemini
+        # Keys are read once and passed to the clients explicitly
+        self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.gemini_api_key = os.getenv("GEMINI_API_KEY")
-        
-        # Initialize model configurations
-        self.model_configs = {
-            'openai': {
-                'basic': {"model": "gpt-4o-mini"},
-                'advanced': {"model": "gpt-4o"},
-                'embeddings': {
-                    "model": "text-embedding-3-small",
-                    "dimensions": 1536
-                }
-            },
-            'gemini': {
-                'basic': {"model": "gemini-1.5-pro"},
-                'advanced': {"model": "gemini-2.0-flash-exp"},
-                'embeddings': {
-                    "model": "text-embedding-004",
-                    "dimensions": 768
-                }
-            }
-        }
-    
+
     def get_model(self, purpose: str, temperature: float = 0, provider: str = "openai"):
-        if provider not in self.model_configs:
+        if provider not in MODEL_CONFIGS:
             raise ValueError(f"Unknown provider: {provider}")
             
-        provider_configs = self.model_configs[provider]
+        provider_configs = MODEL_CONFIGS[provider]
         if purpose not in provider_configs:
             raise ValueError(f"Unknown model purpose: {purpose}")
             
@@ -51,25 +64,38 @@ class ModelManager:
         if provider == "gemini":
             if not self.gemini_api_key:
                 raise ValueError("GEMINI_API_KEY not found in environment variables")
-            if purpose == 'embeddings':
-                from langchain_google_genai import GoogleGenerativeAIEmbeddings
-                return GoogleGenerativeAIEmbeddings(
-                    model=f"models/{config['model']}",
-                    google_api_key=self.gemini_api_key
-                )
-            return ChatGoogleGenerativeAI(
-                model=config["model"],
-                google_api_key=self.gemini_api_key,
-                temperature=temperature
-            )
-            
+            api_key = self.gemini_api_key
+        else:
+            api_key = self.openai_api_key
+
         if purpose == 'embeddings':
-            return OpenAIEmbeddings(
-                model=config["model"],
-                dimensions=config["dimensions"]
-            )
-            
-        return ChatOpenAI(model=config["model"], temperature=temperature)
+            return build_embeddings_model(provider, config["model"], config["dimensions"], api_key)
+        return build_chat_model(provider, config["model"], temperature, api_key)
+
+# Clients are memoized per distinct configuration, so each one (and its HTTP connection pool)
+# is constructed once per process
+@lru_cache(maxsize=32)
+def build_chat_model(provider: str, model: str, temperature: float, api_key: Optional[str]):
+    if provider == "gemini":
+        # Imported only when Gemini is requested; it pulls in google-auth, protobuf and grpc
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(
+            model=model,
+            google_api_key=api_key,
+            temperature=temperature,
+            convert_system_message_to_human=True
+        )
+    return ChatOpenAI(model=model, temperature=temperature, api_key=api_key)
+
+@lru_cache(maxsize=8)
+def build_embeddings_model(provider: str, model: str, dimensions: int, api_key: Optional[str]):
+    if provider == "gemini":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        return GoogleGenerativeAIEmbeddings(
+            model=f"models/{model}",
+            google_api_key=api_key
+        )
+    return OpenAIEmbeddings(model=model, dimensions=dimensions, api_key=api_key)
 
 def initialize_model(purpose: str = 'basic', temperature: float = 0, provider: str = "openai"):
     manager = ModelManager()
@@ -1,40 +1,115 @@
 # src/news_digest.py
 import os
+import base64
 import logging
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
-from typing import Dict
-from model_initializer import initialize_model
+from pathlib import Path
+from urllib.parse import urlencode
+from functools import lru_cache
+from typing import Dict, NamedTuple
+from jinja2 import Environment
 from summary_generator import generate_summaries_by_category
-from utils import setup_logging, load_config
+from utils import setup_logging, load_config, load_env_once
+
+MAILGUN_API_URL = "https://api.mailgun.net"
+EMAIL_SUBJECT = "Savaitės naujienų apžvalga"
+MAILGUN_TIMEOUT = (5, 10)
+
+# Compiled once at import; autoescaping covers category names and summaries
+EMAIL_TEMPLATE = Environment(autoescape=True).from_string(
+    "<html><body>"
+    "{% for category, summary in summaries %}<p><b>{{ category }}</b></p><p>{{ summary }}</p>{% endfor %}"
+    "</body></html>"
+)
+
+# Shared keep-alive session so repeated sends reuse one TLS connection to Mailgun. Only
+# Mailgun's host is mounted. Retries are limited to cases where the message cannot have been
+# accepted: failed connections, and 429 / 503 answers from Mailgun itself. A read timeout or a
+# 502 / 504 from the gateway may follow an accepted message, so those are never re-sent, since
+# a retry could deliver the digest twice
+mailgun_session = requests.Session()
+mailgun_session.mount(MAILGUN_API_URL, HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=4,
+    max_retries=Retry(
+        total=3,
+        connect=3,
+        read=0,
+        other=0,
+        backoff_factor=0.5,
+        status_forcelist=(429, 503),
+        allowed_methods=frozenset({"HEAD", "POST"})
+    )
+))
 
 def get_env_variable(var_name: str) -> str:
-    value = os.getenv(var_name)
-    if not value:
-        logging.error(f"Environment variable {var_name} is not set")
-        raise EnvironmentError(f"Environment variable {var_name} is not set")
-    return value
+    # .env values are merged into os.environ once; a single lookup then covers both sources
+    load_env_once()
+    try:
+        return os.environ[var_name]
+    except KeyError:
+        logging.error("Environment variable %s is not set", var_name)
+        raise EnvironmentError(f"Environment variable {var_name} is not set") from None
+
+class MailgunConfig(NamedTuple):
+    domain: str
+    api_key: str
+    sender_name: str
+    sender_email: str
+    recipient_email: str
+
+@lru_cache(maxsize=1)
+def get_mailgun_config() -> MailgunConfig:
+    # All delivery settings are resolved together on first use, so a missing variable fails
+    # before any summaries are generated, and are reused afterwards
+    return MailgunConfig(
+        domain=get_env_variable('MAILGUN_DOMAIN'),
+        api_key=get_env_variable('MAILGUN_API_KEY'),
+        sender_name=get_env_variable('SENDER_NAME'),
+        sender_email=get_env_variable('SENDER_EMAIL'),
+        recipient_email=get_env_variable('RECIPIENT_EMAIL')
+    )
+
+@lru_cache(maxsize=4)
+def mailgun_auth_header(api_key: str) -> str:
+    # Encoded once per key instead of building an HTTPBasicAuth on every send
+    return "Basic " + base64.b64encode(f"api:{api_key}".encode()).decode()
 
 def generate_email_content(summaries: Dict[str, str], week_number: int) -> str:
-    html_content = "<html><body>"
-    for category, summary in summaries.items():
-        html_content += f"<p><b>{category}</b></p><p>{summary}</p>"
-    html_content += "</body></html>"
-    return html_content
+    return EMAIL_TEMPLATE.render(summaries=summaries.items())
 
 def send_email(subject: str, html_content: str, sender_name: str, sender_email: str, recipient_email: str) -> None:
-    url = f"https://api.mailgun.net/v3/{get_env_variable('MAILGUN_DOMAIN')}/messages"
+    mailgun_config = get_mailgun_config()
+    url = f"{MAILGUN_API_URL}/v3/{mailgun_config.domain}/messages"
     data = {
         "from": f"{sender_name} <{sender_email}>",
         "to": [recipient_email],
         "subject": subject,
         "html": html_content,
     }
-    logging.debug(f"Sending email data: {data}")
+    # The rendered HTML body is deliberately not logged; arguments are only formatted at DEBUG level
+    logging.debug("Sending email %r from %s to %s", subject, data["from"], recipient_email)
     
-    response = requests.post(url, auth=("api", get_env_variable('MAILGUN_API_KEY')), data=data)
+    # The form body is encoded up front so requests sends the bytes as-is
+    body = urlencode(data, doseq=True).encode("utf-8")
+    headers = {
+        "Authorization": mailgun_auth_header(mailgun_config.api_key),
+        "Content-Type": "application/x-www-form-urlencoded",
+    }
+    response = mailgun_session.post(url, data=body, headers=headers, timeout=MAILGUN_TIMEOUT)
     response.raise_for_status()
-    logging.info(f"Email sent to {recipient_email}: {response.status_code}")
+    logging.info("Email sent to %s: %s", recipient_email, response.status_code)
+
+def warm_up_mailgun_connection() -> None:
+    # Opens the pooled connection while summaries are generated so the send skips the handshake
+    try:
+        mailgun_session.head(MAILGUN_API_URL, timeout=5)
+    except requests.RequestException as e:
+        logging.debug("Mailgun connection warm-up failed: %s", e)
 
 def parse_arguments():
     import argparse
@@ -44,30 +119,25 @@ def parse_arguments():
 
 def main(config_path: str):
     config = load_config(config_path)
-    config_dir = os.path.dirname(os.path.abspath(config_path))
     
     # Ensure log file path is correct relative to the root directory
-    root_dir = os.path.abspath(os.path.join(config_dir, ".."))
-    log_file = os.path.join(root_dir, config.get("log_file", "output.log"))
-    log_dir = os.path.dirname(log_file)
-    
-    os.makedirs(log_dir, exist_ok=True)
+    root_dir = Path(config_path).resolve().parent.parent
+    log_file = root_dir / config.get("log_file", "output.log")
+    log_file.parent.mkdir(parents=True, exist_ok=True)
         
-    setup_logging(log_file)
+    setup_logging(str(log_file))
 
-    sender_name = get_env_variable('SENDER_NAME')
-    sender_email = get_env_variable('SENDER_EMAIL')
-    recipient_email = get_env_variable('RECIPIENT_EMAIL')
+    week_number = datetime.now().isocalendar().week
 
-    summaries = generate_summaries_by_category(config_path)
+    mailgun_config = get_mailgun_config()
+
+    threading.Thread(target=warm_up_mailgun_connection, daemon=True).start()
 
-    current_date = datetime.now()
-    week_number = current_date.isocalendar()[1]
+    summaries = generate_summaries_by_category(config_path)
 
     email_content = generate_email_content(summaries, week_number)
 
-    subject = f"Savaitės naujienų apžvalga"
-    send_email(subject, email_content, sender_name, sender_email, recipient_email)
+    send_email(EMAIL_SUBJECT, email_content, mailgun_config.sender_name, mailgun_config.sender_email, mailgun_config.recipient_email)
 
 def run():
     args = parse_arguments()
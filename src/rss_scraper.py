@@ -1,14 +1,16 @@
 # src/rss_scraper.py
-import json
+import asyncio
 import os
-import requests
-import xml.etree.ElementTree as ET
-import re
-import time
+import orjson
+import aiohttp
+from lxml import etree, html
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Tuple
-from utils import setup_logging, load_config
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from html import unescape
+from typing import List, Dict, Any, Optional, Tuple
+from utils import setup_logging, load_config, atomic_write_bytes
 
 def get_zoneinfo():
     try:
@@ -32,67 +34,166 @@ def get_zoneinfo():
     return ZoneInfo
 
 ZoneInfo = get_zoneinfo()
+VILNIUS_TZ = ZoneInfo("Europe/Vilnius")
+OLDER_ITEMS_BEFORE_STOP = 3
+RSS_ITEM_FIELDS = frozenset({'title', 'description', 'guid', 'pubDate', 'link'})
 
-class DateTimeEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        try:
-            return super().default(obj)
-        except TypeError:
-            return str(obj)
+# Sent with every feed request through the shared session. aiohttp adds Accept-Encoding
+# (gzip, deflate, and br when a Brotli decoder is installed) and decompresses transparently
+FEED_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'application/rss+xml, application/xml;q=0.9, */*;q=0.8'
+}
 
 def load_existing_data(file_path: str) -> List[Dict[str, Any]]:
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, 'r') as file:
-                content = file.read()
-                if not content.strip():
-                    logging.warning(f"File {file_path} is empty. Returning an empty list.")
-                    return []
-                return json.loads(content)
-        except json.JSONDecodeError as e:
-            logging.error(f"Error decoding JSON from {file_path}: {e}")
-            logging.info("Returning an empty list and backing up the problematic file.")
-            backup_file(file_path)
-            return []
-    return []
+    # Open directly instead of checking existence first; a missing file simply means a new week
+    try:
+        with open(file_path, 'rb') as file:
+            content = file.read()
+    except FileNotFoundError:
+        return []
+    if not content.strip():
+        logging.warning("File %s is empty. Returning an empty list.", file_path)
+        return []
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError as e:
+        logging.error("Error decoding JSON from %s: %s", file_path, e)
+        logging.info("Returning an empty list and backing up the problematic file.")
+        backup_file(file_path)
+        return []
 
 def backup_file(file_path: str) -> None:
     backup_path = f"{file_path}.bak"
     try:
         os.rename(file_path, backup_path)
-        logging.info(f"Backed up problematic file to {backup_path}")
+        logging.info("Backed up problematic file to %s", backup_path)
     except OSError as e:
-        logging.error(f"Failed to backup file {file_path}: {e}")
+        logging.error("Failed to backup file %s: %s", file_path, e)
 
 def save_data(file_path: str, data: List[Dict[str, Any]]) -> None:
-    with open(file_path, 'w') as file:
-        json.dump(data, file, indent=4, ensure_ascii=False, cls=DateTimeEncoder)
+    # orjson writes datetimes as ISO 8601 natively; anything else it cannot encode falls back to str()
+    atomic_write_bytes(file_path, orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS, default=str))
+
+@lru_cache(maxsize=4096)
+def parse_pub_date(pub_date_str: str) -> datetime:
+    # RFC 822 dates are parsed by email.utils, which is faster than strptime and also accepts
+    # zone names such as GMT; feeds that emit ISO 8601 instead take the C fromisoformat path.
+    # A leading digit is only a hint: RFC 822 dates may omit the weekday ("01 Jan 2024 ..."),
+    # so anything fromisoformat rejects still goes through email.utils. A trailing "Z" is
+    # spelled out as an offset because fromisoformat only accepts it from Python 3.11.
+    # Items within and across feeds often share a timestamp, so repeats skip parsing entirely.
+    # The result keeps the feed's own offset; conversion to local time is left to the items
+    # that survive the week filter
+    pub_date = None
+    if pub_date_str[:1].isdigit():
+        iso_date_str = pub_date_str[:-1] + '+00:00' if pub_date_str.endswith('Z') else pub_date_str
+        try:
+            pub_date = datetime.fromisoformat(iso_date_str)
+        except ValueError:
+            pass
+    if pub_date is None:
+        pub_date = parsedate_to_datetime(pub_date_str)
+    if pub_date.tzinfo is None:
+        # email.utils maps GMT, UT and Z to UTC itself and leaves only "-0000" (UTC with no
+        # local zone information) naive. Unknown zone names ("EEST") and ISO dates without an
+        # offset come back naive too, and pinning those to UTC would silently shift them
+        if not pub_date_str.rstrip().endswith('-0000'):
+            raise ValueError(f"Date without a UTC offset: {pub_date_str}")
+        pub_date = pub_date.replace(tzinfo=timezone.utc)
+    return pub_date
 
 def clean_html(raw_html: str) -> str:
-    cleanr = re.compile('<.*?>')
-    cleantext = re.sub(cleanr, '', raw_html)
-    return cleantext.strip()
-
-def parse_rss_feed(xml_data: str, category: str, start_of_week: datetime, end_of_week: datetime) -> List[Dict[str, str]]:
-    root = ET.fromstring(xml_data)
-    news_items = []
-    for item in root.findall('./channel/item'):
-        parsed_item = parse_rss_item(item, category)
-        if parsed_item and start_of_week <= parsed_item['pub_date'] < end_of_week:
-            news_items.append(parsed_item)
-    return news_items
+    if not raw_html or not raw_html.strip():
+        return ''
+    if '<' not in raw_html:
+        # Without tags there is nothing to parse: plain text is returned as is and
+        # entity-encoded text only needs decoding
+        return unescape(raw_html).strip() if '&' in raw_html else raw_html.strip()
+    try:
+        return html.fromstring(raw_html).text_content().strip()
+    except etree.ParserError:
+        return ''
+    except ValueError:
+        # lxml refuses str input carrying an <?xml ... encoding=...?> declaration; keep the text
+        # rather than letting the error discard the whole feed
+        return unescape(raw_html).strip()
+
+class RssFeedParser:
+    # Incremental feed parser: bytes are fed as they arrive from the network, so parsing overlaps
+    # the download and the rest of the body can be skipped once the feed reaches older items.
+    # Parsed items are dropped right away so memory stays flat regardless of feed size.
+    # recover lets libxml2 skip over malformed markup (e.g. a stray unescaped '&') instead of
+    # discarding the whole feed; such feeds may only yield their items on close()
+    def __init__(self, category: str, start_of_week: datetime, end_of_week: datetime):
+        self.category = category
+        self.start_of_week = start_of_week
+        self.end_of_week = end_of_week
+        self.news_items = []
+        self.older_in_a_row = 0
+        self.done = False
+        self.parser = etree.XMLPullParser(events=('end',), tag='item', recover=True)
+
+    def feed(self, data: bytes) -> bool:
+        # Returns True once the remaining items are known to be older than the week
+        if not self.done:
+            self.parser.feed(data)
+            self.collect_items()
+        return self.done
+
+    def close(self) -> List[Dict[str, Any]]:
+        if not self.done:
+            self.parser.close()
+            self.collect_items()
+        return self.news_items
+
+    def collect_items(self) -> None:
+        for _, item in self.parser.read_events():
+            parsed_item = parse_rss_item(item, self.category)
+            item.clear()
+            while item.getprevious() is not None:
+                del item.getparent()[0]
+            if not parsed_item:
+                continue
+            if parsed_item['pub_date'] < self.start_of_week:
+                # Feeds list newest items first, so a run of items older than the week means the rest
+                # are older too. A short run is tolerated in case a single item is out of order
+                self.older_in_a_row += 1
+                if self.older_in_a_row >= OLDER_ITEMS_BEFORE_STOP:
+                    self.done = True
+                    return
+                continue
+            self.older_in_a_row = 0
+            # Aware datetimes compare correctly across offsets, so only kept items are converted
+            if parsed_item['pub_date'] < self.end_of_week:
+                parsed_item['pub_date'] = parsed_item['pub_date'].astimezone(VILNIUS_TZ)
+                self.news_items.append(parsed_item)
+
+def parse_rss_feed(xml_data: bytes, category: str, start_of_week: datetime, end_of_week: datetime) -> List[Dict[str, str]]:
+    if isinstance(xml_data, str):
+        xml_data = xml_data.encode('utf-8')
+    feed_parser = RssFeedParser(category, start_of_week, end_of_week)
+    feed_parser.feed(xml_data)
+    return feed_parser.close()
 
 def parse_rss_item(item, category: str) -> Dict[str, Any]:
-    title = item.find('title').text.strip()
-    description = clean_html(item.find('description').text.strip())
-    post_id = item.find('guid').text.strip() if item.find('guid') is not None else None
-    pub_date_str = item.find('pubDate').text.strip() if item.find('pubDate') is not None else None
+    # One pass over the item's children instead of a separate findtext scan per field; the
+    # first occurrence of each tag wins, as with findtext
+    fields = {}
+    for child in item:
+        if child.tag in RSS_ITEM_FIELDS and child.tag not in fields:
+            fields[child.tag] = child.text or ''
+
+    title = fields.get('title', '').strip()
+    description = clean_html(fields.get('description', '').strip())
+    post_id = fields.get('guid')
+    post_id = post_id.strip() if post_id is not None else None
+    pub_date_str = fields.get('pubDate')
+    pub_date_str = pub_date_str.strip() if pub_date_str is not None else None
     
-    url = item.find('link')
+    url = fields.get('link')
     if url is not None:
-        url = url.text.strip()
+        url = url.strip()
     elif post_id and post_id.startswith('http'):
         url = post_id
     else:
@@ -100,10 +201,9 @@ def parse_rss_item(item, category: str) -> Dict[str, Any]:
     
     if pub_date_str:
         try:
-            pub_date = datetime.strptime(pub_date_str, '%a, %d %b %Y %H:%M:%S %z')
-            pub_date = pub_date.astimezone(ZoneInfo("Europe/Vilnius"))
-        except ValueError:
-            logging.error(f"Unable to parse date: {pub_date_str}")
+            pub_date = parse_pub_date(pub_date_str)
+        except (TypeError, ValueError):
+            logging.error("Unable to parse date: %s", pub_date_str)
             return None
     else:
         return None
@@ -117,41 +217,112 @@ def parse_rss_item(item, category: str) -> Dict[str, Any]:
         'url': url
     }
 
-def fetch_rss_feed(url: str, headers: Dict[str, str]) -> str:
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    return response.content
+async def fetch_rss_feed(session: aiohttp.ClientSession, url: str, feed_parser: RssFeedParser, headers: Optional[Dict[str, str]] = None, validators: Optional[Dict[str, str]] = None) -> bool:
+    # The body is streamed into feed_parser chunk by chunk, and the download stops early once the
+    # parser has seen enough. Conditional GET: with the ETag / Last-Modified from the previous
+    # fetch an unchanged feed answers 304 with no body, and False is returned. Validators of a
+    # fresh response are recorded in place for the next run, only after its body was read
+    request_headers = dict(headers or {})
+    if validators:
+        if 'etag' in validators:
+            request_headers['If-None-Match'] = validators['etag']
+        if 'last_modified' in validators:
+            request_headers['If-Modified-Since'] = validators['last_modified']
+    async with session.get(url, headers=request_headers) as response:
+        if response.status == 304:
+            return False
+        response.raise_for_status()
+        async for chunk in response.content.iter_any():
+            if feed_parser.feed(chunk):
+                break
+        if validators is not None:
+            validators.clear()
+            if response.headers.get('ETag'):
+                validators['etag'] = response.headers['ETag']
+            if response.headers.get('Last-Modified'):
+                validators['last_modified'] = response.headers['Last-Modified']
+        return True
 
-def scrape_rss_feed(url: str, category: str, start_of_week: datetime, end_of_week: datetime, retries: int = 3, delay: int = 2) -> List[Dict[str, str]]:
-    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+async def scrape_rss_feed(session: aiohttp.ClientSession, url: str, category: str, start_of_week: datetime, end_of_week: datetime, retries: int = 3, delay: int = 2, validators: Optional[Dict[str, str]] = None) -> List[Dict[str, str]]:
     for attempt in range(retries):
         try:
-            xml_data = fetch_rss_feed(url, headers)
-            return parse_rss_feed(xml_data, category, start_of_week, end_of_week)
-        except requests.RequestException as e:
-            handle_request_exception(e, url, attempt, retries, delay)
+            # A fresh parser per attempt, so a partially read body is never combined with a retry
+            feed_parser = RssFeedParser(category, start_of_week, end_of_week)
+            if not await fetch_rss_feed(session, url, feed_parser, validators=validators):
+                logging.info("Feed not modified since the last fetch: %s", url)
+                return []
+            return feed_parser.close()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # Exponential backoff: delay, 2 * delay, 4 * delay, ...
+            backoff = delay * 2 ** attempt
+            handle_request_exception(e, url, attempt, retries, backoff)
+            if attempt < retries - 1:
+                await asyncio.sleep(backoff)
     return []
 
 def handle_request_exception(e, url: str, attempt: int, retries: int, delay: int) -> None:
-    logging.error(f"Error fetching {url}: {e}")
+    logging.error("Error fetching %s: %s", url, e)
     if attempt < retries - 1:
-        logging.info(f"Retrying in {delay} seconds...")
-        time.sleep(delay)
+        logging.info("Retrying in %s seconds...", delay)
     else:
-        logging.error(f"Failed to fetch {url} after {retries} attempts")
+        logging.error("Failed to fetch %s after %s attempts", url, retries)
+
+async def scrape_all_feeds(categories: Dict[str, str], start_of_week: datetime, end_of_week: datetime, retries: int = 3, delay: int = 2, feed_validators: Optional[Dict[str, Dict[str, str]]] = None) -> List[List[Dict[str, str]]]:
+    # All feeds share one session and are fetched concurrently, so the run takes as long as the slowest feed.
+    # The connector keeps connections alive between feeds on the same host and bounds the number
+    # of open sockets, in total and per host
+    connector = aiohttp.TCPConnector(limit=16, limit_per_host=8)
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=FEED_HEADERS) as session:
+        results = await asyncio.gather(*(
+            scrape_rss_feed(
+                session, rss_url, category, start_of_week, end_of_week, retries=retries, delay=delay,
+                validators=feed_validators.setdefault(rss_url, {}) if feed_validators is not None else None
+            )
+            for category, rss_url in categories.items()
+        ), return_exceptions=True)
+
+    # One broken feed (e.g. malformed XML) must not discard the others
+    for i, (category, result) in enumerate(zip(categories, results)):
+        if isinstance(result, Exception):
+            logging.error("Failed to scrape feed for %s: %s", category, result)
+            results[i] = []
+            # Forget the validators so the next run downloads this feed in full again
+            if feed_validators is not None:
+                feed_validators.pop(categories[category], None)
+    return results
+
+def load_feed_validators(file_path: str) -> Dict[str, Dict[str, str]]:
+    try:
+        with open(file_path, 'rb') as file:
+            validators = orjson.loads(file.read())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return {}
+    return validators if isinstance(validators, dict) else {}
+
+def save_feed_validators(file_path: str, validators: Dict[str, Dict[str, str]]) -> None:
+    # Atomic like the weekly file, so a crash mid-write cannot wipe every feed's validators
+    atomic_write_bytes(file_path, orjson.dumps({url: v for url, v in validators.items() if v}))
+
+_ensured_dirs = set()
+
+def ensure_directory(path: str) -> None:
+    # One makedirs call per directory per process; exist_ok avoids a separate existence check
+    if path not in _ensured_dirs:
+        os.makedirs(path, exist_ok=True)
+        _ensured_dirs.add(path)
 
 def get_weekly_file_path(base_folder: str, year: int, week: int) -> str:
-    if not os.path.exists(base_folder):
-        os.makedirs(base_folder)
+    ensure_directory(base_folder)
     return os.path.join(base_folder, f'news_{year}_{week:02}.json')
 
 def get_week_range(year: int, week: int) -> Tuple[datetime, datetime]:
-    start_of_week = datetime.fromisocalendar(year, week, 1).replace(tzinfo=ZoneInfo("Europe/Vilnius"))
+    start_of_week = datetime.fromisocalendar(year, week, 1).replace(tzinfo=VILNIUS_TZ)
     end_of_week = start_of_week + timedelta(days=7)
     return start_of_week, end_of_week
 
 def get_current_year_and_week() -> Tuple[int, int]:
-    current_date = datetime.now(ZoneInfo("Europe/Vilnius"))
+    current_date = datetime.now(VILNIUS_TZ)
     year, week, _ = current_date.isocalendar()
     return year, week
 
@@ -161,11 +332,15 @@ def load_existing_news_data(file_path: str) -> Tuple[List[Dict[str, Any]], set]:
     return existing_data, existing_ids
 
 def add_new_items(news_items: List[Dict[str, str]], existing_data: List[Dict[str, Any]], existing_ids: set) -> int:
+    # Methods are bound once outside the loop; the set doubles as the membership index
+    append = existing_data.append
+    add = existing_ids.add
     new_items_count = 0
     for item in news_items:
-        if item['id'] not in existing_ids:
-            existing_data.append(item)
-            existing_ids.add(item['id'])
+        item_id = item['id']
+        if item_id not in existing_ids:
+            append(item)
+            add(item_id)
             new_items_count += 1
     return new_items_count
 
@@ -183,12 +358,19 @@ def main(config_path: str) -> None:
 
     start_of_week, end_of_week = get_week_range(year, week)
 
-    for category, rss_url in config["categories"].items():
-        news_items = scrape_rss_feed(rss_url, category, start_of_week, end_of_week, retries=config.get("retry_count", 3), delay=config.get("retry_delay", 2))
+    # Validators are kept per weekly file, so the first run of a week always fetches every feed
+    # in full, and they are only written once the items they cover have been saved. The name
+    # must not end in .json, or the summary generator would pick it up as the latest weekly file
+    validators_file = f"{file_path}.validators"
+    feed_validators = load_feed_validators(validators_file)
+
+    results = asyncio.run(scrape_all_feeds(config["categories"], start_of_week, end_of_week, retries=config.get("retry_count", 3), delay=config.get("retry_delay", 2), feed_validators=feed_validators))
+    for news_items in results:
         add_new_items(news_items, existing_data, existing_ids)
 
     save_data(file_path, existing_data)
-    logging.info(f"Script completed successfully at {datetime.now(ZoneInfo('Europe/Vilnius'))}")
+    save_feed_validators(validators_file, feed_validators)
+    logging.info("Script completed successfully at %s", datetime.now(VILNIUS_TZ))
 
 def run():
     args = parse_arguments()
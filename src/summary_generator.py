@@ -1,48 +1,149 @@
 # src/summary_generator.py
 import os
-import glob
-import json
+import heapq
+import orjson
+import time
+import hashlib
 import logging
+import sqlite3
+import threading
 from datetime import datetime
-from typing import List, Dict, Any
-from langchain.schema import HumanMessage
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Set
+from langchain.schema import BaseMessage, HumanMessage, SystemMessage
 from model_initializer import initialize_model
 from utils import setup_logging, load_config
-from difflib import SequenceMatcher
+from rapidfuzz import fuzz
 import numpy as np
 
-def initialize_models(config_path: str):
+def load_ai_config(config_path: str) -> Dict[str, Any]:
     if not os.path.isabs(config_path):
         config_path = os.path.abspath(os.path.join(os.path.dirname(__file__), config_path))
     
     config = load_config(config_path)
-    ai_config = config.get("ai_config", {"provider": "openai"})
-    
-    model = initialize_model(
+    return config.get("ai_config", {"provider": "openai"})
+
+def initialize_chat_model(config_path: str):
+    ai_config = load_ai_config(config_path)
+    return initialize_model(
         'basic', 
         temperature=ai_config.get("temperature", {}).get("chat", 0.7),
         provider=ai_config.get("provider", "openai")
     )
-    
-    embeddings_model = initialize_model(
+
+def initialize_ranking_model(config_path: str):
+    # Scoring stories is deterministic at temperature 0, which also makes its responses safe to cache
+    ai_config = load_ai_config(config_path)
+    return initialize_model(
+        'basic',
+        temperature=ai_config.get("temperature", {}).get("ranking", 0),
+        provider=ai_config.get("provider", "openai")
+    )
+
+def initialize_embeddings_model(config_path: str):
+    ai_config = load_ai_config(config_path)
+    return initialize_model(
         'embeddings',
         provider=ai_config.get("provider", "openai")
     )
-    
-    return model, embeddings_model
+
+def initialize_models(config_path: str):
+    return initialize_chat_model(config_path), initialize_embeddings_model(config_path)
+
+# Fraction of the smaller title's trigrams two titles must share to be compared for duplication
+TRIGRAM_OVERLAP = 0.25
+SHORT_TITLE_LENGTH = 12
+MAX_SUMMARY_WORKERS = 8
+
+# Static instructions go first as byte-identical system messages, shared by every category, so
+# the provider can reuse the cached prompt prefix; only the stories differ between calls
+SUMMARY_SYSTEM_MESSAGE = SystemMessage(content=(
+    "Tu esi patyręs žurnalistas ir naujienų apžvalgininkas. Tavo užduotis:\n\n"
+    "1. Sukurti TIKSLIAI 120 žodžių paragrafą (ne ilgesnį!)\n"
+    "2. Naudoti formalų ir aiškų stilių\n"
+    "3. Sujungti naujienas į rišlų ir nuoseklų pasakojimą\n"
+    "4. Pabrėžti 3-4 svarbiausius įvykius\n"
+    "5. Vengti detalių, kurios nėra esminės\n"
+    "6. Užtikrinti, kad kiekvienas sakinys neštų naują informaciją\n"
+    "7. SVARBU: Vengti bendrų frazių kaip 'šie įvykiai atspindi', 'situacija sudėtinga', "
+    "'tai rodo pastangas' ir panašių beprasmių apibendrinimų\n"
+    "8. Kiekvienas sakinys turi turėti konkrečią informaciją arba faktą\n\n"
+    "Ši apžvalga skirta skaitytojui, kuris nesekė naujienų ir nori sužinoti esminius "
+    "savaitės įvykius. SVARBU: neviršyti 120 žodžių limito."
+))
+
+RANKING_SYSTEM_MESSAGE = SystemMessage(content=(
+    "Tu esi patyręs naujienų redaktorius, kuris ruošia nurodytos kategorijos naujienų apžvalgą. "
+    "Įvertink kiekvienos naujienos svarbą nuo 1 iki 10 (10 - ypač svarbi, 1 - mažai svarbi), "
+    "atsižvelgdamas į šiuos kriterijus:\n\n"
+    "1. Tinkamumas nurodytai kategorijai ir temos aktualumas (2 taškai)\n"
+    "2. Poveikis visuomenei ir valstybei (3 taškai)\n"
+    "3. Naujienų aktualumas laiko atžvilgiu (2 taškai)\n"
+    "4. Ilgalaikė įtaka (2 taškai)\n"
+    "5. Visuomenės interesas (1 taškas)\n\n"
+    "LABAI SVARBU: Jei yra kelios naujienos apie tą patį įvykį, įvertink jas skirtingai, "
+    "kad išvengtume pasikartojančių temų. Pavyzdžiui:\n"
+    "- Jei yra 3 naujienos apie tą patį įvykį, pagrindinei naujienai duok aukštesnį įvertinimą (8-10), "
+    "o kitoms žemesnį (1-3)\n\n"
+    "Pateik įvertinimus tokiu formatu:\n"
+    "1:8\n2:5\n3:9\n..."
+))
 
 default_config = os.path.join(os.path.dirname(__file__), "config.json")
-model, embeddings_model = initialize_models(default_config)
+
+# Models are created on first use rather than at import time, so importing this module
+# (e.g. from news_digest or the tests) does not construct API clients
+model = None
+ranking_model = None
+embeddings_model = None
+
+# Persistent response cache for ranking calls, set up by configure_llm_cache
+llm_cache = None
+
+# Category workers may ask for a model at the same time
+_model_lock = threading.Lock()
+
+def get_model():
+    global model
+    if model is None:
+        with _model_lock:
+            if model is None:
+                model = initialize_chat_model(default_config)
+    return model
+
+def get_ranking_model():
+    global ranking_model
+    if ranking_model is None:
+        with _model_lock:
+            if ranking_model is None:
+                ranking_model = initialize_ranking_model(default_config)
+    return ranking_model
+
+def get_embeddings_model():
+    global embeddings_model
+    if embeddings_model is None:
+        with _model_lock:
+            if embeddings_model is None:
+                embeddings_model = initialize_embeddings_model(default_config)
+    return embeddings_model
 
 def get_latest_json_file(directory: str) -> str:
-    json_files = glob.glob(os.path.join(directory, "*.json"))
+    # One directory read; DirEntry caches its stat, so each file is stat'ed once. Hidden files are
+    # skipped, as they were with glob
+    with os.scandir(directory) as entries:
+        json_files = [
+            entry for entry in entries
+            if entry.name.endswith(".json") and not entry.name.startswith(".") and entry.is_file()
+        ]
     if not json_files:
         raise FileNotFoundError("No JSON files found in the directory.")
-    return max(json_files, key=os.path.getmtime)
+    return max(json_files, key=lambda entry: entry.stat().st_mtime).path
 
 def read_json_file(file_path: str) -> List[Dict[str, Any]]:
-    with open(file_path, 'r') as file:
-        return json.load(file)
+    # Weekly dumps run to several MB; orjson parses the raw bytes without a separate decode pass
+    with open(file_path, 'rb') as file:
+        return orjson.loads(file.read())
 
 def sort_by_category(news_items: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
     categorized_news = {}
@@ -54,31 +155,53 @@ def sort_by_category(news_items: List[Dict[str, Any]]) -> Dict[str, List[Dict[st
     return categorized_news
 
 def generate_summary(news_items: List[Dict[str, Any]]) -> str:
-    prompt = (
-        "Tu esi patyręs žurnalistas ir naujienų apžvalgininkas. Tavo užduotis:\n\n"
-        "1. Sukurti TIKSLIAI 120 žodžių paragrafą (ne ilgesnį!)\n"
-        "2. Naudoti formalų ir aiškų stilių\n"
-        "3. Sujungti naujienas į rišlų ir nuoseklų pasakojimą\n"
-        "4. Pabrėžti 3-4 svarbiausius įvykius\n"
-        "5. Vengti detalių, kurios nėra esminės\n"
-        "6. Užtikrinti, kad kiekvienas sakinys neštų naują informaciją\n"
-        "7. SVARBU: Vengti bendrų frazių kaip 'šie įvykiai atspindi', 'situacija sudėtinga', "
-        "'tai rodo pastangas' ir panašių beprasmių apibendrinimų\n"
-        "8. Kiekvienas sakinys turi turėti konkrečią informaciją arba faktą\n\n"
-        "Ši apžvalga skirta skaitytojui, kuris nesekė naujienų ir nori sužinoti esminius "
-        "savaitės įvykius. SVARBU: neviršyti 120 žodžių limito.\n\n"
-        "Apibendrink šias naujienas:\n\n"
+    # Stories are collected and joined once rather than appended to the prompt one by one
+    prompt = "Apibendrink šias naujienas:\n\n" + "".join(
+        f"- {item['title']}:\n{item.get('ai_summary') or item.get('description', '')}\n\n"
+        for item in news_items
     )
-    
-    for item in news_items:
-        content = item.get('ai_summary') or item.get('description', '')
-        prompt += f"- {item['title']}:\n{content}\n\n"
             
-    response = model.invoke([HumanMessage(content=prompt)])
+    response = get_model().invoke([SUMMARY_SYSTEM_MESSAGE, HumanMessage(content=prompt)])
     return response.content
 
 def similar_titles(title1: str, title2: str, threshold: float = 0.8) -> bool:
-    return SequenceMatcher(None, title1.lower(), title2.lower()).ratio() > threshold
+    # rapidfuzz computes the normalized Indel similarity in C++; with score_cutoff it rejects
+    # pairs whose lengths alone rule out a match and abandons the rest as soon as the threshold
+    # becomes unreachable, returning 0
+    cutoff = threshold * 100
+    return fuzz.ratio(title1.lower(), title2.lower(), score_cutoff=cutoff) > cutoff
+
+def title_trigrams(title: str) -> Set[str]:
+    return {title[i:i + 3] for i in range(len(title) - 2)} or {title}
+
+def find_title_candidates(lowered: List[str]) -> List[Set[int]]:
+    # Blocking pass for deduplication: instead of scoring every pair, only
+    # titles sharing a reasonable fraction of their character trigrams (found through an inverted
+    # index) are compared. Short titles have too few trigrams to block on and are compared with
+    # everything. Takes lowercased titles and returns, for each one, the indices of later titles
+    # worth comparing
+    grams = [title_trigrams(title) for title in lowered]
+    postings = defaultdict(list)
+    for idx, title_grams in enumerate(grams):
+        for gram in title_grams:
+            postings[gram].append(idx)
+    short = [idx for idx, title in enumerate(lowered) if len(title) < SHORT_TITLE_LENGTH]
+
+    candidates = []
+    for i, title_grams in enumerate(grams):
+        if len(lowered[i]) < SHORT_TITLE_LENGTH:
+            candidates.append(set(range(i + 1, len(lowered))))
+            continue
+        shared = Counter()
+        for gram in title_grams:
+            shared.update(postings[gram])
+        matches = {
+            j for j, count in shared.items()
+            if j > i and count >= max(1, TRIGRAM_OVERLAP * min(len(title_grams), len(grams[j])))
+        }
+        matches.update(j for j in short if j > i)
+        candidates.append(matches)
+    return candidates
 
 def cosine_similarity(v1: List[float], v2: List[float]) -> float:
     dot_product = sum(x * y for x, y in zip(v1, v2))
@@ -86,47 +209,63 @@ def cosine_similarity(v1: List[float], v2: List[float]) -> float:
     norm2 = sum(x * x for x in v2) ** 0.5
     return dot_product / (norm1 * norm2) if norm1 > 0 and norm2 > 0 else 0
 
+def cosine_similarity_matrix(embeddings: List[List[float]]) -> np.ndarray:
+    # All pairwise similarities in one matrix product over L2-normalized rows. Zero vectors keep
+    # a similarity of 0 to everything, as in cosine_similarity
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    if vectors.ndim != 2:
+        return np.zeros((len(embeddings), len(embeddings)), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    vectors /= norms
+    return vectors @ vectors.T
+
 def deduplicate_news_items(news_items: List[Dict[str, Any]], use_semantic: bool = False) -> List[Dict[str, Any]]:
     logging.info(f"Starting deduplication of {len(news_items)} news items")
     
     # Sort by AI summary length (prioritize more detailed items)
     sorted_news = sorted(
         news_items,
-        key=lambda x: len(x.get('ai_summary', '')) if isinstance(x.get('ai_summary', ''), str) else 0,
+        key=lambda x: len(summary) if isinstance(summary := x.get('ai_summary'), str) else 0,
         reverse=True
     )
     
     # Get embeddings only if semantic similarity is enabled
-    embeddings = []
     if use_semantic:
+        # One batched request for all titles instead of a round trip per title; the client splits
+        # very long lists into provider-sized chunks itself
         titles = [item['title'] for item in sorted_news]
-        embeddings = [
-            embeddings_model.embed_query(title) 
-            for title in titles
-        ]
+        embeddings = get_embeddings_model().embed_documents(titles)
+        similarities = cosine_similarity_matrix(embeddings)
     
     unique_news = []
     seen_indices = set()
+    # Titles are lowercased once here rather than on every comparison
+    lowered_titles = [item['title'].lower() for item in sorted_news]
+    title_candidates = find_title_candidates(lowered_titles)
     
     for i, item in enumerate(sorted_news):
         if i in seen_indices:
             continue
-            
-        for j in range(i + 1, len(sorted_news)):
+
+        # String similarity is checked for the blocked candidates, semantic similarity for the
+        # pairs already above the threshold in the similarity matrix
+        others = title_candidates[i]
+        if use_semantic:
+            others = others.union((np.flatnonzero(similarities[i, i + 1:] > 0.70) + i + 1).tolist())
+        for j in sorted(others):
             if j in seen_indices:
                 continue
                 
             # Check string similarity
-            if similar_titles(sorted_news[i]['title'], sorted_news[j]['title']):
+            if j in title_candidates[i] and similar_titles(lowered_titles[i], lowered_titles[j]):
                 seen_indices.add(j)
                 continue
                 
             # Check semantic similarity only if enabled
-            if use_semantic:
-                similarity = cosine_similarity(embeddings[i], embeddings[j])
-                if similarity > 0.70:
-                    seen_indices.add(j)
-                    logging.debug(f"Semantic duplicate found: '{sorted_news[i]['title']}' and '{sorted_news[j]['title']}' (similarity: {similarity:.2f})")
+            if use_semantic and similarities[i, j] > 0.70:
+                seen_indices.add(j)
+                logging.debug(f"Semantic duplicate found: '{sorted_news[i]['title']}' and '{sorted_news[j]['title']}' (similarity: {similarities[i, j]:.2f})")
         
         unique_news.append(item)
     
@@ -148,36 +287,21 @@ def evaluate_story_importance(news_items: List[Dict[str, Any]], category: str, p
     if len(news_items) <= target_stories:
         return news_items
         
-    prompt = (
-        f"Tu esi patyręs naujienų redaktorius, kuris ruošia '{category}' kategorijos naujienų apžvalgą. "
-        "Įvertink kiekvienos naujienos svarbą nuo 1 iki 10 (10 - ypač svarbi, 1 - mažai svarbi), "
-        "atsižvelgdamas į šiuos kriterijus:\n\n"
-        f"1. Tinkamumas '{category}' kategorijai ir temos aktualumas (2 taškai)\n"
-        "2. Poveikis visuomenei ir valstybei (3 taškai)\n"
-        "3. Naujienų aktualumas laiko atžvilgiu (2 taškai)\n"
-        "4. Ilgalaikė įtaka (2 taškai)\n"
-        "5. Visuomenės interesas (1 taškas)\n\n"
-        "LABAI SVARBU: Jei yra kelios naujienos apie tą patį įvykį, įvertink jas skirtingai, "
-        "kad išvengtume pasikartojančių temų. Pavyzdžiui:\n"
-        "- Jei yra 3 naujienos apie tą patį įvykį, pagrindinei naujienai duok aukštesnį įvertinimą (8-10), "
-        "o kitoms žemesnį (1-3)\n\n"
-        "Pateik įvertinimus tokiu formatu:\n"
-        "1:8\n2:5\n3:9\n...\n\n"
-        "Naujienos:\n"
-    )
-    
+    parts = [f"Kategorija: {category}\n\nNaujienos:\n"]
     for item in news_items:
-        prompt += f"#{item['simple_id']}: {item['title']}\n"
+        parts.append(f"#{item['simple_id']}: {item['title']}\n")
         if 'ai_summary' in item and isinstance(item.get('ai_summary'), str):
-            prompt += f"Santrauka: {item['ai_summary'][:200]}...\n"
-        prompt += "\n"
+            parts.append(f"Santrauka: {item['ai_summary'][:200]}...\n")
+        parts.append("\n")
+    prompt = "".join(parts)
     
+    response_content = None
     try:
-        response = model.invoke([HumanMessage(content=prompt)])
+        response_content = invoke_ranking_model([RANKING_SYSTEM_MESSAGE, HumanMessage(content=prompt)])
         
         # Parse importance scores
         importance_scores = {}
-        for line in response.content.strip().split('\n'):
+        for line in response_content.strip().split('\n'):
             if ':' in line:
                 try:
                     idx, score = line.split(':')
@@ -190,26 +314,96 @@ def evaluate_story_importance(news_items: List[Dict[str, Any]], category: str, p
         if not importance_scores:
             raise ValueError("No valid importance scores found in response")
         
-        # Sort stories based on scores and handle ties using publication date
-        sorted_items = sorted(
+        # Pick the top stories by score, breaking ties on publication date. nlargest keeps only
+        # target_stories candidates and returns the same order as a full reverse sort
+        return heapq.nlargest(
+            target_stories,
             news_items,
             key=lambda x: (
                 importance_scores.get(x['simple_id'], 0),
                 x.get('pub_date', '1970-01-01')  # Fallback date for sorting
-            ),
-            reverse=True
+            )
         )
         
-        for item in sorted_items[:target_stories]:
-            score = importance_scores.get(item['simple_id'], 0)
-        
-        return sorted_items[:target_stories]
-        
     except Exception as e:
         logging.error(f"Error processing AI response: {e}")
-        logging.error(f"AI response was: {response.content}")
+        logging.error(f"AI response was: {response_content}")
         logging.info("Falling back to date-based sorting")
-        return sorted(news_items, key=lambda x: x['pub_date'], reverse=True)[:target_stories]
+        return heapq.nlargest(target_stories, news_items, key=lambda x: x['pub_date'])
+
+class LLMResponseCache:
+    # Exact-match cache for temperature-0 model calls, kept in SQLite so a rerun over the same
+    # week's stories (or a retry after a failed send) reuses stored responses instead of paying
+    # for them again. Keys cover the model, its temperature and every message, so any change in
+    # input is a miss; entries older than ttl_days are ignored and pruned on open
+    def __init__(self, database_path: str, ttl_days: float):
+        self.database_path = database_path
+        self.ttl_days = ttl_days
+        self.ttl = ttl_days * 86400
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(database_path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, content TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self.connection.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+
+    @staticmethod
+    def make_key(llm, messages: List[BaseMessage]) -> str:
+        payload = orjson.dumps({
+            "model": getattr(llm, "model_name", None) or getattr(llm, "model", None),
+            "temperature": getattr(llm, "temperature", None),
+            "messages": [[message.type, message.content] for message in messages],
+        })
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT content FROM responses WHERE key = ? AND created_at >= ?", (key, time.time() - self.ttl)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, content: str) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, content, created_at) VALUES (?, ?, ?)", (key, content, time.time())
+            )
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+def configure_llm_cache(ai_config: Dict[str, Any], base_folder: str) -> None:
+    # Only the temperature-0 ranking calls are cached; summaries are sampled at a higher
+    # temperature and are generated afresh on every run. The open cache is reused while its file
+    # and expiry stay the same; otherwise its connection is closed before it is replaced
+    global llm_cache
+    cache_file = ai_config.get("llm_cache_file")
+    database_path = os.path.join(base_folder, cache_file) if cache_file else None
+    ttl_days = ai_config.get("llm_cache_days", 7)
+    if llm_cache is not None:
+        if (llm_cache.database_path, llm_cache.ttl_days) == (database_path, ttl_days):
+            return
+        llm_cache.close()
+    llm_cache = LLMResponseCache(database_path, ttl_days) if database_path else None
+
+def invoke_ranking_model(messages: List[BaseMessage]) -> str:
+    llm = get_ranking_model()
+    cache = llm_cache
+    if cache is None or getattr(llm, "temperature", None) != 0:
+        return llm.invoke(messages).content
+    key = cache.make_key(llm, messages)
+    content = cache.get(key)
+    if content is None:
+        content = llm.invoke(messages).content
+        cache.set(key, content)
+    return content
+
+def summarize_category(category: str, items: List[Dict[str, Any]]) -> str:
+    logging.info(f"Processing category: {category}")
+    top_stories = evaluate_story_importance(items, category)
+    return generate_summary(top_stories)
 
 def generate_summaries_by_category(config_path: str) -> Dict[str, str]:
     config = load_config(config_path)
@@ -228,17 +422,25 @@ def generate_summaries_by_category(config_path: str) -> Dict[str, str]:
     summaries_by_category = {}
     try:
         latest_file = get_latest_json_file(base_folder)
+        configure_llm_cache(config.get("ai_config", {}), base_folder)
         logging.info(f"Latest JSON file: {latest_file}")
 
         news_data = read_json_file(latest_file)
         news_data = deduplicate_news_items(news_data)
         categorized_news = sort_by_category(news_data)
 
-        for category, items in categorized_news.items():
-            logging.info(f"Processing category: {category}")
-            top_stories = evaluate_story_importance(items, category)
-            summary = generate_summary(top_stories)
-            summaries_by_category[category] = summary
+        # Categories are independent, so their LLM round-trips run concurrently; results are
+        # collected in category order so the digest layout does not depend on timing
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_SUMMARY_WORKERS, len(categorized_news)))) as executor:
+            futures = {
+                category: executor.submit(summarize_category, category, items)
+                for category, items in categorized_news.items()
+            }
+        for category, future in futures.items():
+            try:
+                summaries_by_category[category] = future.result()
+            except Exception as e:
+                logging.error(f"Error summarizing category {category}: {e}")
 
     except FileNotFoundError as e:
         logging.error(e)
@@ -249,8 +451,9 @@ def generate_summaries_by_category(config_path: str) -> Dict[str, str]:
 
 def main(config_path: str):
     # Re-initialize models with provided config
-    global model, embeddings_model
+    global model, ranking_model, embeddings_model
     model, embeddings_model = initialize_models(config_path)
+    ranking_model = initialize_ranking_model(config_path)
     
     summaries = generate_summaries_by_category(config_path)
     for category, summary in summaries.items():
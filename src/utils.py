@@ -1,6 +1,13 @@
 # src/utils.py
 import logging
 import os
+import threading
+import orjson
+from typing import Dict, Optional
+from dotenv import dotenv_values
+
+_env_values: Optional[Dict[str, str]] = None
+_env_lock = threading.Lock()
 
 def setup_logging(log_file: str, force: bool = False):
     log_dir = os.path.dirname(log_file)
@@ -23,6 +30,27 @@ def setup_logging(log_file: str, force: bool = False):
         logging.getLogger("openai").setLevel(logging.WARNING)
 
 def load_config(config_path: str) -> dict:
-    import json
-    with open(config_path, 'r') as file:
-        return json.load(file)
+    with open(config_path, 'rb') as file:
+        return orjson.loads(file.read())
+
+def atomic_write_bytes(file_path: str, data: bytes) -> None:
+    # Write to a temporary file next to the target and swap it in, so a crash mid-write
+    # leaves the previous file intact instead of a truncated one
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, file_path)
+
+def load_env_once() -> Dict[str, str]:
+    # Parse .env a single time per process; values override the inherited environment,
+    # matching load_dotenv(override=True)
+    global _env_values
+    if _env_values is None:
+        with _env_lock:
+            if _env_values is None:
+                values = {key: value for key, value in dotenv_values().items() if value is not None}
+                os.environ.update(values)
+                _env_values = values
+    return _env_values
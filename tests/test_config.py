@@ -39,7 +39,7 @@ class TestConfig(unittest.TestCase):
         result = load_config(config_path)
         
         self.assertEqual(result, expected_output)
-        mock_file.assert_called_once_with(config_path, 'r')
+        mock_file.assert_called_once_with(config_path, 'rb')
 
 if __name__ == "__main__":
     unittest.main()
@@ -3,10 +3,37 @@ import unittest
 from unittest.mock import patch, MagicMock
 import os
 
+from src.model_initializer import ModelManager, build_chat_model, build_embeddings_model
+
 class TestModelInitializer(unittest.TestCase):
-    @patch('src.model_initializer.load_dotenv')
+    def setUp(self):
+        # Each test gets a fresh singleton so environment patches take effect
+        ModelManager._instance = None
+        build_chat_model.cache_clear()
+        build_embeddings_model.cache_clear()
+
+    def tearDown(self):
+        ModelManager._instance = None
+        build_chat_model.cache_clear()
+        build_embeddings_model.cache_clear()
+
+    @patch('src.model_initializer.load_env_once')
     @patch('src.model_initializer.ChatOpenAI')
-    def test_initialize_model_openai(self, mock_ChatOpenAI, mock_load_dotenv):
+    def test_initialize_model_reuses_manager_and_model(self, mock_ChatOpenAI, mock_load_env_once):
+        with patch.dict('os.environ', {'OPENAI_API_KEY': 'fake_openai_api_key'}):
+            from src.model_initializer import initialize_model
+            first = initialize_model('basic', temperature=0.2, provider="openai")
+            second = initialize_model('basic', temperature=0.2, provider="openai")
+            initialize_model('basic', temperature=0.7, provider="openai")
+
+        self.assertIs(first, second)
+        self.assertIs(ModelManager(), ModelManager())
+        mock_load_env_once.assert_called_once_with()
+        self.assertEqual(mock_ChatOpenAI.call_count, 2)
+
+    @patch('src.model_initializer.load_env_once')
+    @patch('src.model_initializer.ChatOpenAI')
+    def test_initialize_model_openai(self, mock_ChatOpenAI, mock_load_env_once):
         # Mock the model initialization to return a MagicMock instance
         mock_model = MagicMock()
         mock_ChatOpenAI.return_value = mock_model
@@ -15,13 +42,13 @@ class TestModelInitializer(unittest.TestCase):
             from src.model_initializer import initialize_model
             model = initialize_model('basic', provider="openai")
 
-            mock_load_dotenv.assert_called_once_with(override=True)
-            mock_ChatOpenAI.assert_called_once_with(model="gpt-4o-mini", temperature=0)
+            mock_load_env_once.assert_called_once_with()
+            mock_ChatOpenAI.assert_called_once_with(model="gpt-4o-mini", temperature=0, api_key='fake_openai_api_key')
             self.assertEqual(model, mock_model)
 
-    @patch('src.model_initializer.load_dotenv')
-    @patch('src.model_initializer.ChatGoogleGenerativeAI')
-    def test_initialize_model_gemini(self, mock_ChatGemini, mock_load_dotenv):
+    @patch('src.model_initializer.load_env_once')
+    @patch('langchain_google_genai.ChatGoogleGenerativeAI')
+    def test_initialize_model_gemini(self, mock_ChatGemini, mock_load_env_once):
         # Mock the model initialization to return a MagicMock instance
         mock_model = MagicMock()
         mock_ChatGemini.return_value = mock_model
@@ -30,31 +57,36 @@ class TestModelInitializer(unittest.TestCase):
             from src.model_initializer import initialize_model
             model = initialize_model('basic', provider="gemini")
 
-            mock_load_dotenv.assert_called_once_with(override=True)
+            mock_load_env_once.assert_called_once_with()
             mock_ChatGemini.assert_called_once_with(
                 model="gemini-1.5-pro",
                 google_api_key='fake_gemini_api_key',
-                temperature=0
+                temperature=0,
+                convert_system_message_to_human=True
             )
             self.assertEqual(model, mock_model)
 
-    @patch('src.model_initializer.load_dotenv')
-    def test_initialize_model_invalid_provider(self, mock_load_dotenv):
+    def test_gemini_package_not_imported_at_module_load(self):
+        import src.model_initializer as model_initializer
+        self.assertFalse(hasattr(model_initializer, 'ChatGoogleGenerativeAI'))
+
+    @patch('src.model_initializer.load_env_once')
+    def test_initialize_model_invalid_provider(self, mock_load_env_once):
         from src.model_initializer import initialize_model
         with self.assertRaises(ValueError) as context:
             initialize_model('basic', provider="invalid_provider")
         self.assertTrue("Unknown provider: invalid_provider" in str(context.exception))
 
-    @patch('src.model_initializer.load_dotenv')
-    def test_initialize_model_invalid_purpose(self, mock_load_dotenv):
+    @patch('src.model_initializer.load_env_once')
+    def test_initialize_model_invalid_purpose(self, mock_load_env_once):
         from src.model_initializer import initialize_model
         with self.assertRaises(ValueError) as context:
             initialize_model('invalid_purpose')
         self.assertTrue("Unknown model purpose: invalid_purpose" in str(context.exception))
 
-    @patch('src.model_initializer.load_dotenv')
+    @patch('src.model_initializer.load_env_once')
     @patch('src.model_initializer.OpenAIEmbeddings')
-    def test_initialize_model_embeddings_openai(self, mock_OpenAIEmbeddings, mock_load_dotenv):
+    def test_initialize_model_embeddings_openai(self, mock_OpenAIEmbeddings, mock_load_env_once):
         # Mock the model initialization to return a MagicMock instance
         mock_model = MagicMock()
         mock_OpenAIEmbeddings.return_value = mock_model
@@ -63,15 +95,16 @@ class TestModelInitializer(unittest.TestCase):
             from src.model_initializer import initialize_model
             model = initialize_model('embeddings', provider="openai")
 
-            mock_load_dotenv.assert_called_once_with(override=True)
+            mock_load_env_once.assert_called_once_with()
             mock_OpenAIEmbeddings.assert_called_once_with(
                 model="text-embedding-3-small",
-                dimensions=1536
+                dimensions=1536,
+                api_key='fake_openai_api_key'
             )
             self.assertEqual(model, mock_model)
 
-    @patch('src.model_initializer.load_dotenv')
-    def test_missing_api_key_gemini(self, mock_load_dotenv):
+    @patch('src.model_initializer.load_env_once')
+    def test_missing_api_key_gemini(self, mock_load_env_once):
         with patch.dict('os.environ', {}, clear=True):
             from src.model_initializer import initialize_model
             with self.assertRaises(ValueError) as context:
@@ -2,13 +2,18 @@
 import unittest
 from unittest.mock import patch, MagicMock
 import os
+import base64
 import requests
 import sys
 import tempfile
+from urllib.parse import parse_qs
 from src.news_digest import (
     get_env_variable,
     generate_email_content,
     send_email,
+    get_mailgun_config,
+    mailgun_auth_header,
+    warm_up_mailgun_connection,
     main,
     parse_arguments,
     run
@@ -17,10 +22,22 @@ from datetime import datetime
 
 class TestNewsDigest(unittest.TestCase):
 
+    def setUp(self):
+        get_mailgun_config.cache_clear()
+
+    def tearDown(self):
+        get_mailgun_config.cache_clear()
+
     @patch.dict(os.environ, {"TEST_VAR": "test_value"})
     def test_get_env_variable_success(self):
         self.assertEqual(get_env_variable("TEST_VAR"), "test_value")
 
+    def test_get_env_variable_allows_empty_and_reads_current_value(self):
+        with patch.dict(os.environ, {"TEST_VAR": ""}):
+            self.assertEqual(get_env_variable("TEST_VAR"), "")
+        with patch.dict(os.environ, {"TEST_VAR": "updated"}):
+            self.assertEqual(get_env_variable("TEST_VAR"), "updated")
+
     @patch.dict(os.environ, {}, clear=True)
     def test_get_env_variable_failure(self):
         with self.assertRaises(EnvironmentError):
@@ -37,12 +54,22 @@ class TestNewsDigest(unittest.TestCase):
         )
         self.assertEqual(generate_email_content(summaries, week_number), expected_content)
 
-    @patch("requests.post")
+    def test_generate_email_content_escapes_html(self):
+        summaries = {"R&D": 'Prices <rose> by "5%"'}
+        self.assertEqual(
+            generate_email_content(summaries, 1),
+            "<html><body><p><b>R&amp;D</b></p><p>Prices &lt;rose&gt; by &#34;5%&#34;</p></body></html>"
+        )
+
+    @patch("src.news_digest.mailgun_session.post")
     @patch("src.news_digest.get_env_variable")
     def test_send_email_success(self, mock_get_env_variable, mock_requests_post):
         mock_get_env_variable.side_effect = lambda var_name: {
             "MAILGUN_DOMAIN": "test.mailgun.org",
             "MAILGUN_API_KEY": "key-test",
+            "SENDER_NAME": "Test Sender",
+            "SENDER_EMAIL": "sender@test.com",
+            "RECIPIENT_EMAIL": "recipient@test.com",
         }[var_name]
 
         mock_response = MagicMock()
@@ -57,31 +84,65 @@ class TestNewsDigest(unittest.TestCase):
             recipient_email="recipient@test.com"
         )
 
-        mock_requests_post.assert_called_once_with(
-            "https://api.mailgun.net/v3/test.mailgun.org/messages",
-            auth=("api", "key-test"),
-            data={
-                "from": "Test Sender <sender@test.com>",
-                "to": ["recipient@test.com"],
-                "subject": "Test Subject",
-                "html": "<html><body>Test</body></html>",
-            }
-        )
+        mock_requests_post.assert_called_once()
+        args, kwargs = mock_requests_post.call_args
+        self.assertEqual(args, ("https://api.mailgun.net/v3/test.mailgun.org/messages",))
+        self.assertEqual(kwargs["timeout"], (5, 10))
+        self.assertEqual(kwargs["headers"], {
+            "Authorization": "Basic " + base64.b64encode(b"api:key-test").decode(),
+            "Content-Type": "application/x-www-form-urlencoded",
+        })
+        self.assertEqual(parse_qs(kwargs["data"].decode("utf-8")), {
+            "from": ["Test Sender <sender@test.com>"],
+            "to": ["recipient@test.com"],
+            "subject": ["Test Subject"],
+            "html": ["<html><body>Test</body></html>"],
+        })
+
+    def test_mailgun_auth_header_matches_basic_auth(self):
+        request = requests.Request("POST", "https://api.mailgun.net", auth=("api", "key-test")).prepare()
+        self.assertEqual(mailgun_auth_header("key-test"), request.headers["Authorization"])
 
+    def test_mailgun_session_retries_transient_errors(self):
+        from src.news_digest import mailgun_session
+        adapter = mailgun_session.get_adapter("https://api.mailgun.net/v3/example.com/messages")
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+        self.assertIn("POST", adapter.max_retries.allowed_methods)
+        # Responses after which Mailgun may already have accepted the message are not retried
+        self.assertNotIn(502, adapter.max_retries.status_forcelist)
+        self.assertNotIn(504, adapter.max_retries.status_forcelist)
+        self.assertEqual(adapter.max_retries.read, 0)
+        self.assertGreater(adapter.max_retries.connect, 0)
+
+    @patch("src.news_digest.get_env_variable")
+    def test_get_mailgun_config_is_cached(self, mock_get_env_variable):
+        mock_get_env_variable.side_effect = lambda var_name: var_name.lower()
+
+        first = get_mailgun_config()
+        second = get_mailgun_config()
+
+        self.assertIs(first, second)
+        self.assertEqual(first.domain, "mailgun_domain")
+        self.assertEqual(first.api_key, "mailgun_api_key")
+        self.assertEqual(first.recipient_email, "recipient_email")
+        self.assertEqual(mock_get_env_variable.call_count, 5)
+
+    @patch("src.news_digest.warm_up_mailgun_connection")
     @patch("src.news_digest.load_config")
     @patch("src.news_digest.setup_logging")
     @patch("src.news_digest.get_env_variable")
     @patch("src.news_digest.generate_summaries_by_category")
     @patch("src.news_digest.send_email")
-    @patch("os.makedirs")
     @patch("src.news_digest.parse_arguments")
-    def test_main(self, mock_parse_arguments, mock_makedirs, mock_send_email, mock_generate_summaries_by_category, mock_get_env_variable, mock_setup_logging, mock_load_config):
+    def test_main(self, mock_parse_arguments, mock_send_email, mock_generate_summaries_by_category, mock_get_env_variable, mock_setup_logging, mock_load_config, mock_warm_up):
         with tempfile.TemporaryDirectory() as temp_dir:
             mock_parse_arguments.return_value = MagicMock(config="test_config.json")
             mock_load_config.return_value = {
-                "log_file": os.path.join(temp_dir, "test.log")
+                "log_file": os.path.join(temp_dir, "logs", "test.log")
             }
             mock_get_env_variable.side_effect = lambda var_name: {
+                "MAILGUN_DOMAIN": "test.mailgun.org",
+                "MAILGUN_API_KEY": "key-test",
                 "SENDER_NAME": "Test Sender",
                 "SENDER_EMAIL": "sender@test.com",
                 "RECIPIENT_EMAIL": "recipient@test.com",
@@ -92,10 +153,20 @@ class TestNewsDigest(unittest.TestCase):
 
             mock_parse_arguments.assert_called_once()
             mock_load_config.assert_called_once_with("test_config.json")
-            mock_setup_logging.assert_called_once_with(os.path.join(temp_dir, "test.log"))
+            mock_setup_logging.assert_called_once_with(os.path.join(temp_dir, "logs", "test.log"))
             mock_generate_summaries_by_category.assert_called_once_with("test_config.json")
             mock_send_email.assert_called_once()
-            mock_makedirs.assert_called_once_with(os.path.dirname(os.path.join(os.path.abspath(os.path.join(os.path.dirname(os.path.abspath("test_config.json")), "..")), os.path.join(temp_dir, "test.log"))), exist_ok=True)
+            self.assertEqual(mock_send_email.call_args[0][0], "Savaitės naujienų apžvalga")
+            self.assertEqual(mock_send_email.call_args[0][2:], ("Test Sender", "sender@test.com", "recipient@test.com"))
+            self.assertTrue(os.path.isdir(os.path.join(temp_dir, "logs")))
+
+    @patch("src.news_digest.mailgun_session.head")
+    def test_warm_up_mailgun_connection(self, mock_head):
+        warm_up_mailgun_connection()
+        mock_head.assert_called_once_with("https://api.mailgun.net", timeout=5)
+
+        mock_head.side_effect = requests.ConnectionError("offline")
+        warm_up_mailgun_connection()  # Failures are swallowed
 
     @patch('sys.argv', ['news_digest.py', '--config', 'test_config.json'])
     def test_parse_arguments(self):
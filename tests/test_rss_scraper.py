@@ -1,10 +1,12 @@
 # tests/test_rss_scraper.py
 import unittest
-from unittest.mock import patch, mock_open, MagicMock
+from unittest.mock import patch, mock_open, MagicMock, AsyncMock
 import os
 import json
-import requests
+import asyncio
+import aiohttp
 import xml.etree.ElementTree as ET
+from lxml.etree import fromstring as etree_fromstring
 import argparse
 import tempfile
 from datetime import datetime, timedelta, timezone
@@ -13,14 +15,18 @@ from src.rss_scraper import (
     backup_file,
     save_data,
     clean_html,
+    RssFeedParser,
     parse_rss_feed,
     parse_rss_item,
+    parse_pub_date,
     fetch_rss_feed,
     scrape_rss_feed,
+    scrape_all_feeds,
+    load_feed_validators,
+    save_feed_validators,
     handle_request_exception,
     get_weekly_file_path,
     get_week_range,
-    DateTimeEncoder,
     get_zoneinfo,
     main,
     load_config,
@@ -34,6 +40,21 @@ from src.rss_scraper import (
 # Ensure ZoneInfo is imported correctly
 ZoneInfo = get_zoneinfo()
 
+def mock_session(content=b"", side_effect=None, chunk_size=None):
+    async def iter_any():
+        step = chunk_size or max(len(content), 1)
+        for i in range(0, len(content), step):
+            yield content[i:i + step]
+
+    mock_response = MagicMock()
+    mock_response.content.iter_any = iter_any
+    mock_response.raise_for_status = MagicMock()
+    session = MagicMock()
+    session.get.return_value.__aenter__.return_value = mock_response
+    if side_effect is not None:
+        session.get.side_effect = side_effect
+    return session
+
 class TestRssScraper(unittest.TestCase):
 
     def setUp(self):
@@ -47,8 +68,8 @@ class TestRssScraper(unittest.TestCase):
             data = load_existing_data("mock_path")
             self.assertEqual(data, [{"id": "1"}])
 
-    @patch("os.path.exists", return_value=False)
-    def test_load_existing_data_file_not_exist(self, mock_exists):
+    @patch("builtins.open", side_effect=FileNotFoundError)
+    def test_load_existing_data_file_not_exist(self, mock_file):
         data = load_existing_data("mock_path")
         self.assertEqual(data, [])
 
@@ -66,39 +87,133 @@ class TestRssScraper(unittest.TestCase):
             data = load_existing_data("mock_path")
             self.assertEqual(data, [])
 
-    @patch("builtins.open", new_callable=mock_open)
-    def test_save_data(self, mock_file):
+    @patch("src.rss_scraper.atomic_write_bytes")
+    def test_save_data(self, mock_atomic_write):
         save_data("mock_path", self.mock_data)
-        mock_file.assert_called_once_with("mock_path", 'w')
-        self.assertTrue(mock_file().write.called)
+        mock_atomic_write.assert_called_once()
+        self.assertEqual(mock_atomic_write.call_args[0][0], "mock_path")
+
+    def test_save_data_serializes_datetimes(self):
+        pub_date = datetime(2022, 7, 25, 13, 0, tzinfo=timezone(timedelta(hours=3)))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "news.json")
+            save_data(file_path, [{"id": "1", "title": "Ąžuolas", "pub_date": pub_date}])
+            self.assertEqual(load_existing_data(file_path), [
+                {"id": "1", "title": "Ąžuolas", "pub_date": pub_date.isoformat()}
+            ])
 
     def test_clean_html(self):
         raw_html = "<p>Some <b>bold</b> text.</p>"
         clean_text = clean_html(raw_html)
         self.assertEqual(clean_text, "Some bold text.")
 
-    @patch("requests.get")
-    def test_fetch_rss_feed(self, mock_get):
-        mock_response = MagicMock()
-        mock_response.content = "<rss></rss>"
-        mock_response.raise_for_status = MagicMock()
-        mock_get.return_value = mock_response
-
-        xml_data = fetch_rss_feed("http://example.com/rss", {})
-        self.assertEqual(xml_data, "<rss></rss>")
-
-    @patch("requests.get")
-    @patch("time.sleep", return_value=None)
-    def test_scrape_rss_feed_with_retries(self, mock_sleep, mock_get):
-        mock_get.side_effect = requests.RequestException("Error")
-        results = scrape_rss_feed("http://example.com/rss", "category", datetime.now(), datetime.now(), retries=2, delay=1)
+    def test_clean_html_entities_and_empty(self):
+        self.assertEqual(clean_html("<p>Tom &amp; Jerry</p>"), "Tom & Jerry")
+        self.assertEqual(clean_html("   "), "")
+        self.assertEqual(clean_html("<!-- comment only -->"), "")
+
+    def test_clean_html_with_encoding_declaration(self):
+        raw_html = '<?xml version="1.0" encoding="utf-8"?><p>Tom &amp; Jerry</p>'
+        self.assertEqual(clean_html(raw_html), '<?xml version="1.0" encoding="utf-8"?><p>Tom & Jerry</p>')
+
+    def test_parse_rss_feed_keeps_item_with_encoding_declaration_in_description(self):
+        xml_data = (
+            "<rss><channel><item><title>T</title><link>http://example.com/1</link>"
+            "<description><![CDATA[<?xml version=\"1.0\" encoding=\"utf-8\"?><p>Body</p>]]></description>"
+            "<pubDate>Tue, 26 Jul 2022 10:00:00 +0000</pubDate></item></channel></rss>"
+        )
+        start_of_week = datetime(2022, 7, 25, tzinfo=ZoneInfo("Europe/Vilnius"))
+        result = parse_rss_feed(xml_data, "Test Category", start_of_week, start_of_week + timedelta(days=7))
+        self.assertEqual([item['url'] for item in result], ["http://example.com/1"])
+
+    @patch("src.rss_scraper.html.fromstring")
+    def test_clean_html_text_without_tags_skips_parser(self, mock_fromstring):
+        self.assertEqual(clean_html("  Plain description  "), "Plain description")
+        self.assertEqual(clean_html("Tom &amp; Jerry &#8211; &quot;live&quot;"), 'Tom & Jerry \u2013 "live"')
+        mock_fromstring.assert_not_called()
+
+    def test_fetch_rss_feed(self):
+        session = mock_session(b"<rss><channel><item><title>T</title><link>http://example.com/1</link>"
+                               b"<pubDate>Tue, 26 Jul 2022 10:00:00 +0000</pubDate></item></channel></rss>", chunk_size=16)
+        start_of_week = datetime(2022, 7, 25, tzinfo=ZoneInfo("Europe/Vilnius"))
+        feed_parser = RssFeedParser("Test Category", start_of_week, start_of_week + timedelta(days=7))
+        self.assertTrue(asyncio.run(fetch_rss_feed(session, "http://example.com/rss", feed_parser, {})))
+        self.assertEqual([item['url'] for item in feed_parser.close()], ["http://example.com/1"])
+        session.get.assert_called_once_with("http://example.com/rss", headers={})
+
+    def test_fetch_rss_feed_stops_reading_after_older_items(self):
+        chunks_read = []
+        items = [
+            f"<item><title>T{i}</title><link>http://example.com/{i}</link>"
+            f"<pubDate>Mon, {day} Jul 2022 10:00:00 +0000</pubDate></item>".encode()
+            for i, day in enumerate([26, 18, 17, 16, 15])
+        ]
+
+        async def iter_any():
+            for chunk in [b"<rss><channel>", *items, b"</channel></rss>"]:
+                chunks_read.append(chunk)
+                yield chunk
+
+        session = mock_session()
+        session.get.return_value.__aenter__.return_value.content.iter_any = iter_any
+        start_of_week = datetime(2022, 7, 25, tzinfo=ZoneInfo("Europe/Vilnius"))
+        feed_parser = RssFeedParser("Test Category", start_of_week, start_of_week + timedelta(days=7))
+
+        asyncio.run(fetch_rss_feed(session, "http://example.com/rss", feed_parser))
+
+        # The body after the third older item in a row is never read
+        self.assertEqual(len(chunks_read), 5)
+        self.assertEqual([item['title'] for item in feed_parser.close()], ['T0'])
+
+    def test_fetch_rss_feed_conditional_get(self):
+        session = mock_session(b"<rss></rss>")
+        response = session.get.return_value.__aenter__.return_value
+        response.status = 200
+        response.headers = {"ETag": '"v2"', "Last-Modified": "Mon, 25 Jul 2022 10:00:00 GMT"}
+        validators = {"etag": '"v1"'}
+        feed_parser = RssFeedParser("Test Category", datetime.now(timezone.utc), datetime.now(timezone.utc))
+
+        fetched = asyncio.run(fetch_rss_feed(session, "http://example.com/rss", feed_parser, validators=validators))
+
+        self.assertTrue(fetched)
+        session.get.assert_called_once_with("http://example.com/rss", headers={"If-None-Match": '"v1"'})
+        self.assertEqual(validators, {"etag": '"v2"', "last_modified": "Mon, 25 Jul 2022 10:00:00 GMT"})
+
+    def test_scrape_rss_feed_not_modified(self):
+        session = mock_session()
+        session.get.return_value.__aenter__.return_value.status = 304
+        with patch("src.rss_scraper.parse_rss_item") as mock_parse_rss_item:
+            results = asyncio.run(scrape_rss_feed(session, "http://example.com/rss", "category", datetime.now(), datetime.now(), validators={"etag": '"v1"'}))
         self.assertEqual(results, [])
-        self.assertEqual(mock_get.call_count, 2)
+        mock_parse_rss_item.assert_not_called()
 
-    @patch("requests.get")
-    def test_scrape_rss_feed_success(self, mock_get):
-        mock_response = MagicMock()
-        mock_response.content = """
+    def test_feed_validators_round_trip(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "news_2023_30.json.validators")
+            self.assertEqual(load_feed_validators(path), {})
+            save_feed_validators(path, {"http://a": {"etag": '"v1"'}, "http://b": {}})
+            self.assertEqual(load_feed_validators(path), {"http://a": {"etag": '"v1"'}})
+
+    def test_save_feed_validators_is_atomic(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "news_2023_30.json.validators")
+            save_feed_validators(path, {"http://a": {"etag": '"v1"'}})
+            # A failed write leaves the previous validators in place
+            with patch("src.utils.os.replace", side_effect=OSError("disk full")):
+                with self.assertRaises(OSError):
+                    save_feed_validators(path, {"http://a": {"etag": '"v2"'}})
+            self.assertEqual(load_feed_validators(path), {"http://a": {"etag": '"v1"'}})
+
+    @patch("src.rss_scraper.asyncio.sleep", new_callable=AsyncMock)
+    def test_scrape_rss_feed_with_retries(self, mock_sleep):
+        session = mock_session(side_effect=aiohttp.ClientError("Error"))
+        results = asyncio.run(scrape_rss_feed(session, "http://example.com/rss", "category", datetime.now(), datetime.now(), retries=2, delay=1))
+        self.assertEqual(results, [])
+        self.assertEqual(session.get.call_count, 2)
+        mock_sleep.assert_awaited_once_with(1)
+
+    def test_scrape_rss_feed_success(self):
+        session = mock_session(b"""
         <rss>
             <channel>
                 <item>
@@ -115,32 +230,56 @@ class TestRssScraper(unittest.TestCase):
                 </item>
             </channel>
         </rss>
-        """
-        mock_response.raise_for_status = MagicMock()
-        mock_get.return_value = mock_response
+        """)
 
         start_of_week = datetime(2022, 7, 25, tzinfo=ZoneInfo("Europe/Vilnius"))
         end_of_week = start_of_week + timedelta(days=7)
 
-        results = scrape_rss_feed("http://example.com/rss", "Test Category", start_of_week, end_of_week)
+        results = asyncio.run(scrape_rss_feed(session, "http://example.com/rss", "Test Category", start_of_week, end_of_week))
         self.assertEqual(len(results), 2)
         self.assertEqual(results[0]['title'], 'Title 1')
         self.assertEqual(results[1]['title'], 'Title 2')
 
-    @patch("os.makedirs")
-    @patch("os.path.exists", side_effect=[False, True])
-    def test_get_weekly_file_path(self, mock_exists, mock_makedirs):
-        path = get_weekly_file_path("base_folder", 2023, 30)
-        mock_exists.assert_called_with("base_folder")
-        mock_makedirs.assert_called_once_with("base_folder")
-        self.assertTrue(path.endswith("news_2023_30.json"))
+    @patch("src.rss_scraper.scrape_rss_feed", new_callable=AsyncMock)
+    def test_scrape_all_feeds(self, mock_scrape_rss_feed):
+        mock_scrape_rss_feed.side_effect = lambda session, url, category, *args, **kwargs: [{"id": url, "category": category}]
+        categories = {"A": "http://example.com/a", "B": "http://example.com/b"}
+        results = asyncio.run(scrape_all_feeds(categories, datetime.now(), datetime.now()))
+        self.assertEqual(results, [
+            [{"id": "http://example.com/a", "category": "A"}],
+            [{"id": "http://example.com/b", "category": "B"}]
+        ])
+        self.assertEqual(mock_scrape_rss_feed.await_count, 2)
+
+    @patch("src.rss_scraper.scrape_rss_feed", new_callable=AsyncMock)
+    def test_scrape_all_feeds_session_headers(self, mock_scrape_rss_feed):
+        mock_scrape_rss_feed.side_effect = lambda session, *args, **kwargs: [dict(session.headers)]
+        results = asyncio.run(scrape_all_feeds({"A": "http://example.com/a"}, datetime.now(), datetime.now()))
+        self.assertIn("Mozilla/5.0", results[0][0]["User-Agent"])
+        self.assertIn("application/rss+xml", results[0][0]["Accept"])
+
+    @patch("src.rss_scraper.scrape_rss_feed", new_callable=AsyncMock)
+    def test_scrape_all_feeds_isolates_failures(self, mock_scrape_rss_feed):
+        mock_scrape_rss_feed.side_effect = [ValueError("bad feed"), [{"id": "b"}]]
+        categories = {"A": "http://example.com/a", "B": "http://example.com/b"}
+        feed_validators = {"http://example.com/a": {"etag": '"a"'}, "http://example.com/b": {"etag": '"b"'}}
+        results = asyncio.run(scrape_all_feeds(categories, datetime.now(), datetime.now(), feed_validators=feed_validators))
+        self.assertEqual(results, [[], [{"id": "b"}]])
+        self.assertEqual(feed_validators, {"http://example.com/b": {"etag": '"b"'}})
+
+    @patch("src.rss_scraper.asyncio.sleep", new_callable=AsyncMock)
+    def test_scrape_rss_feed_backs_off_exponentially(self, mock_sleep):
+        session = mock_session(side_effect=aiohttp.ClientError("Network error"))
+        results = asyncio.run(scrape_rss_feed(session, "http://example.com/rss", "category", datetime.now(), datetime.now(), retries=3, delay=1))
+        self.assertEqual(results, [])
+        self.assertEqual([c.args for c in mock_sleep.await_args_list], [(1,), (2,)])
 
     @patch("os.makedirs")
-    @patch("os.path.exists", return_value=True)
-    def test_get_weekly_file_path_exists(self, mock_exists, mock_makedirs):
-        path = get_weekly_file_path("base_folder", 2023, 30)
-        mock_exists.assert_called_with("base_folder")
-        mock_makedirs.assert_not_called()
+    def test_get_weekly_file_path(self, mock_makedirs):
+        with patch("src.rss_scraper._ensured_dirs", set()):
+            path = get_weekly_file_path("base_folder", 2023, 30)
+            get_weekly_file_path("base_folder", 2023, 31)
+        mock_makedirs.assert_called_once_with("base_folder", exist_ok=True)
         self.assertTrue(path.endswith("news_2023_30.json"))
 
     def test_get_week_range(self):
@@ -153,31 +292,16 @@ class TestRssScraper(unittest.TestCase):
             backup_file("test_file")
             mock_rename.assert_called_once_with("test_file", "test_file.bak")
 
-    def test_date_time_encoder(self):
-        date = datetime.now()
-        encoded = json.dumps({'date': date}, cls=DateTimeEncoder)
-        self.assertIn(date.isoformat(), encoded)
-    
-    def test_date_time_encoder_direct_call(self):
-        encoder = DateTimeEncoder()
-        result = encoder.default("test_string")
-        self.assertEqual(result, "test_string")
-
-    def test_date_time_encoder_non_datetime(self):
-        data = {'key': 'value'}
-        encoded = json.dumps(data, cls=DateTimeEncoder)
-        self.assertIn('"key": "value"', encoded)
-
     @patch.dict('sys.modules', {'zoneinfo': None})
     def test_get_zoneinfo_importerror(self):
         ZoneInfo = get_zoneinfo()
         self.assertTrue(hasattr(ZoneInfo, 'utcoffset'))
 
     def test_handle_request_exception(self):
-        with patch('time.sleep') as mock_sleep, patch('logging.error') as mock_error, patch('logging.info') as mock_info:
+        with patch('logging.error') as mock_error, patch('logging.info') as mock_info:
             handle_request_exception(Exception("Test error"), "http://example.com/rss", 0, 3, 2)
-            mock_error.assert_called_with("Error fetching http://example.com/rss: Test error")
-            mock_info.assert_called_with("Retrying in 2 seconds...")
+            self.assertEqual(mock_error.call_args[0][0] % mock_error.call_args[0][1:], "Error fetching http://example.com/rss: Test error")
+            mock_info.assert_called_with("Retrying in %s seconds...", 2)
 
     def test_parse_rss_feed(self):
         xml_data = """
@@ -212,6 +336,68 @@ class TestRssScraper(unittest.TestCase):
         self.assertEqual(len(result), 2)
         self.assertEqual(result[0]['title'], 'Title 1')
         self.assertEqual(result[1]['title'], 'Title 2')
+        self.assertEqual(result[0]['pub_date'].tzinfo, ZoneInfo("Europe/Vilnius"))
+
+    def test_parse_rss_feed_recovers_from_malformed_markup(self):
+        xml_data = (
+            "<rss><channel>"
+            "<item><title>Tom & Jerry</title><link>http://example.com/1</link><guid>http://example.com/1</guid>"
+            "<pubDate>Tue, 26 Jul 2022 10:00:00 +0000</pubDate></item>"
+            "<item><title>Second</title><link>http://example.com/2</link><guid>http://example.com/2</guid>"
+            "<pubDate>Tue, 26 Jul 2022 11:00:00 +0000</pubDate></item>"
+            "</channel></rss>"
+        )
+        start_of_week = datetime(2022, 7, 25, tzinfo=ZoneInfo("Europe/Vilnius"))
+        result = parse_rss_feed(xml_data, "Test Category", start_of_week, start_of_week + timedelta(days=7))
+        self.assertEqual([item['id'] for item in result], ["http://example.com/1", "http://example.com/2"])
+
+    @patch("src.rss_scraper.parse_rss_item", wraps=parse_rss_item)
+    def test_parse_rss_feed_stops_after_older_items(self, mock_parse_rss_item):
+        dates = ["01 Aug", "25 Jul", "18 Jul", "26 Jul", "17 Jul", "16 Jul", "15 Jul", "14 Jul"]
+        items = "".join(
+            f"<item><title>T{i}</title><link>http://example.com/{i}</link><guid>http://example.com/{i}</guid>"
+            f"<pubDate>Mon, {date} 2022 10:00:00 +0000</pubDate></item>"
+            for i, date in enumerate(dates)
+        )
+        start_of_week = datetime(2022, 7, 25, tzinfo=ZoneInfo("Europe/Vilnius"))
+        end_of_week = start_of_week + timedelta(days=7)
+
+        result = parse_rss_feed(f"<rss><channel>{items}</channel></rss>", "Test Category", start_of_week, end_of_week)
+
+        # The single out-of-order older item does not stop parsing; three in a row do
+        self.assertEqual([item['title'] for item in result], ['T1', 'T3'])
+        self.assertEqual(mock_parse_rss_item.call_count, 7)
+
+    def test_parse_pub_date_is_cached(self):
+        parse_pub_date.cache_clear()
+        first = parse_pub_date("Mon, 25 Jul 2022 10:00:00 +0000")
+        second = parse_pub_date("Mon, 25 Jul 2022 10:00:00 +0000")
+        self.assertIs(first, second)
+        self.assertEqual(first, datetime(2022, 7, 25, 10, 0, tzinfo=timezone.utc))
+        self.assertEqual(first.utcoffset(), timedelta(0))
+        self.assertEqual(parse_pub_date.cache_info().hits, 1)
+
+    def test_parse_pub_date_zone_names_and_unknown_zone(self):
+        self.assertEqual(parse_pub_date("Mon, 25 Jul 2022 10:00:00 GMT"), datetime(2022, 7, 25, 10, 0, tzinfo=timezone.utc))
+        self.assertEqual(parse_pub_date("Mon, 25 Jul 2022 10:00:00 -0000"), datetime(2022, 7, 25, 10, 0, tzinfo=timezone.utc))
+        self.assertEqual(parse_pub_date("Mon, 25 Jul 2022 10:00:00 UT"), datetime(2022, 7, 25, 10, 0, tzinfo=timezone.utc))
+        # Unknown zone names and missing offsets would otherwise be read as UTC
+        for pub_date_str in ("Mon, 25 Jul 2022 10:00:00 EEST", "Mon, 25 Jul 2022 10:00:00", "2022-07-25T10:00:00"):
+            with self.assertRaises(ValueError):
+                parse_pub_date(pub_date_str)
+
+    def test_parse_pub_date_iso_8601(self):
+        self.assertEqual(parse_pub_date("2022-07-25T13:00:00+03:00"), datetime(2022, 7, 25, 10, 0, tzinfo=timezone.utc))
+        self.assertEqual(parse_pub_date("2022-07-25T10:00:00Z"), datetime(2022, 7, 25, 10, 0, tzinfo=timezone.utc))
+        self.assertEqual(parse_pub_date("2022-07-25T10:00:00.250Z"), datetime(2022, 7, 25, 10, 0, 0, 250000, tzinfo=timezone.utc))
+        # Rejected by both parsers; parse_rss_item catches either error type
+        with self.assertRaises((TypeError, ValueError)):
+            parse_pub_date("2022-13-45")
+
+    def test_parse_pub_date_rfc_822_without_weekday(self):
+        # Starts with a digit but is not ISO 8601
+        self.assertEqual(parse_pub_date("01 Jan 2024 10:00:00 +0000"), datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc))
+        self.assertEqual(parse_pub_date("1 Jan 2024 12:00:00 +0200"), datetime(2024, 1, 1, 10, 0, tzinfo=timezone.utc))
 
     def test_parse_rss_item_value_error(self):
         item = ET.Element('item')
@@ -224,6 +410,18 @@ class TestRssScraper(unittest.TestCase):
             self.assertIsNone(result)
             self.assertIn("Unable to parse date: Invalid Date", cm.output[0])
 
+    def test_parse_rss_item_ignores_extension_elements(self):
+        item = etree_fromstring(
+            '<item xmlns:atom="http://www.w3.org/2005/Atom"><!-- note -->'
+            '<atom:link href="http://example.com/feed"/><title> Title </title>'
+            '<link>http://example.com/a</link><link>http://example.com/b</link>'
+            '<guid>http://example.com/a</guid><pubDate>Mon, 25 Jul 2022 10:00:00 +0000</pubDate></item>'
+        )
+        result = parse_rss_item(item, "category")
+        self.assertEqual(result['title'], "Title")
+        self.assertEqual(result['url'], "http://example.com/a")
+        self.assertEqual(result['description'], "")
+
     def test_parse_rss_item_missing_pub_date(self):
         item = ET.Element('item')
         ET.SubElement(item, 'title').text = "Title"
@@ -268,12 +466,13 @@ class TestRssScraper(unittest.TestCase):
 
     @patch("builtins.open", new_callable=mock_open, read_data='{"categories": {"category": "http://example.com/rss"}, "base_folder": "base_folder", "log_file": "log_file"}')
     @patch("src.rss_scraper.get_current_year_and_week", return_value=(2023, 30))
-    @patch("src.rss_scraper.scrape_rss_feed", return_value=[])
+    @patch("src.rss_scraper.scrape_rss_feed", new_callable=AsyncMock, return_value=[])
     @patch("src.rss_scraper.setup_logging")
     @patch("src.rss_scraper.save_data")
     @patch("src.rss_scraper.load_existing_news_data", return_value=([], set()))
     @patch("src.rss_scraper.add_new_items")
-    def test_main(self, mock_add_new_items, mock_load_existing_news_data, mock_save_data, mock_setup_logging, mock_scrape_rss_feed, mock_get_current_year_and_week, mock_open):
+    @patch("src.rss_scraper.save_feed_validators")
+    def test_main(self, mock_save_feed_validators, mock_add_new_items, mock_load_existing_news_data, mock_save_data, mock_setup_logging, mock_scrape_rss_feed, mock_get_current_year_and_week, mock_open):
         with tempfile.TemporaryDirectory() as temp_dir:
             mock_open.return_value.read.return_value = json.dumps({
                 "categories": {"category": "http://example.com/rss"},
@@ -285,6 +484,7 @@ class TestRssScraper(unittest.TestCase):
             mock_scrape_rss_feed.assert_called_once()
             mock_save_data.assert_called_once()
             mock_add_new_items.assert_called_once()
+            mock_save_feed_validators.assert_called_once()
 
     @patch('argparse.ArgumentParser.parse_args',
            return_value=argparse.Namespace(config='test_config.json'))
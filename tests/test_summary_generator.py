@@ -6,6 +6,10 @@ import json
 import logging
 from unittest.mock import patch, MagicMock, call
 from datetime import datetime
+import time
+import sqlite3
+from langchain.schema import HumanMessage, SystemMessage
+from src import summary_generator
 from src.summary_generator import (
     get_latest_json_file,
     read_json_file,
@@ -16,7 +20,15 @@ from src.summary_generator import (
     deduplicate_news_items,
     evaluate_story_importance,
     cosine_similarity,
+    cosine_similarity_matrix,
     similar_titles,
+    find_title_candidates,
+    get_model,
+    initialize_ranking_model,
+    configure_llm_cache,
+    invoke_ranking_model,
+    SUMMARY_SYSTEM_MESSAGE,
+    RANKING_SYSTEM_MESSAGE,
 )
 
 class TestSummaryGenerator(unittest.TestCase):
@@ -43,6 +55,76 @@ class TestSummaryGenerator(unittest.TestCase):
             },
         ]
 
+    @patch('src.summary_generator.model', None)
+    @patch('src.summary_generator.initialize_chat_model')
+    def test_get_model_initializes_lazily_once(self, mock_initialize_chat_model):
+        mock_initialize_chat_model.return_value = MagicMock()
+        self.assertIs(get_model(), mock_initialize_chat_model.return_value)
+        self.assertIs(get_model(), mock_initialize_chat_model.return_value)
+        mock_initialize_chat_model.assert_called_once()
+
+    @patch('src.summary_generator.initialize_model')
+    @patch('src.summary_generator.load_ai_config')
+    def test_ranking_model_uses_ranking_temperature(self, mock_load_ai_config, mock_initialize_model):
+        mock_load_ai_config.return_value = {"provider": "openai", "temperature": {"chat": 0.7, "ranking": 0.2}}
+        initialize_ranking_model("config.json")
+        mock_initialize_model.assert_called_once_with('basic', temperature=0.2, provider="openai")
+
+        mock_load_ai_config.return_value = {"provider": "openai"}
+        initialize_ranking_model("config.json")
+        self.assertEqual(mock_initialize_model.call_args.kwargs["temperature"], 0)
+
+    def test_configure_llm_cache(self):
+        configure_llm_cache({"provider": "openai"}, "/project")
+        self.assertIsNone(summary_generator.llm_cache)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            configure_llm_cache({"llm_cache_file": "llm_cache.sqlite", "llm_cache_days": 7}, temp_dir)
+            cache = summary_generator.llm_cache
+            self.assertTrue(os.path.exists(os.path.join(temp_dir, "llm_cache.sqlite")))
+            cache.set("key", "1:8")
+            self.assertEqual(cache.get("key"), "1:8")
+            with patch('src.summary_generator.time.time', return_value=time.time() + 8 * 86400):
+                self.assertIsNone(cache.get("key"))
+
+            # Repeated runs share one connection; a changed setting closes it before replacing it
+            configure_llm_cache({"llm_cache_file": "llm_cache.sqlite", "llm_cache_days": 7}, temp_dir)
+            self.assertIs(summary_generator.llm_cache, cache)
+            configure_llm_cache({"llm_cache_file": "llm_cache.sqlite", "llm_cache_days": 1}, temp_dir)
+            self.assertIsNot(summary_generator.llm_cache, cache)
+            with self.assertRaises(sqlite3.ProgrammingError):
+                cache.get("key")
+            configure_llm_cache({}, temp_dir)
+            self.assertIsNone(summary_generator.llm_cache)
+
+    @patch('src.summary_generator.ranking_model')
+    @patch('src.summary_generator.model')
+    def test_only_temperature_zero_ranking_is_cached(self, mock_model, mock_ranking_model):
+        mock_ranking_model.model_name = "gpt-test"
+        mock_ranking_model.temperature = 0
+        mock_ranking_model.invoke.return_value = MagicMock(content="1:8")
+        messages = [SystemMessage(content="rank"), HumanMessage(content="stories")]
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            configure_llm_cache({"llm_cache_file": "llm_cache.sqlite"}, temp_dir)
+            try:
+                self.assertEqual(invoke_ranking_model(messages), "1:8")
+                self.assertEqual(invoke_ranking_model(messages), "1:8")
+                self.assertEqual(mock_ranking_model.invoke.call_count, 1)
+
+                # A sampled model is never answered from the cache
+                mock_ranking_model.temperature = 0.7
+                invoke_ranking_model(messages)
+                self.assertEqual(mock_ranking_model.invoke.call_count, 2)
+
+                # Summaries do not go through the cache at all
+                mock_model.invoke.return_value = MagicMock(content="Summary")
+                generate_summary([{"title": "T", "description": "D"}])
+                generate_summary([{"title": "T", "description": "D"}])
+                self.assertEqual(mock_model.invoke.call_count, 2)
+            finally:
+                configure_llm_cache({}, temp_dir)
+
     def test_get_latest_json_file(self):
         with tempfile.TemporaryDirectory() as temp_dir:
             file1 = os.path.join(temp_dir, "file1.json")
@@ -53,6 +135,13 @@ class TestSummaryGenerator(unittest.TestCase):
             os.utime(file1, (0, 100))
             os.utime(file2, (0, 200))
 
+            # Sidecars and hidden files are never picked as the weekly file
+            for name in ("file2.json.validators", ".hidden.json"):
+                path = os.path.join(temp_dir, name)
+                open(path, 'a').close()
+                os.utime(path, (0, 300))
+            os.mkdir(os.path.join(temp_dir, "dir.json"))
+
             self.assertEqual(get_latest_json_file(temp_dir), file2)
 
     def test_get_latest_json_file_no_files(self):
@@ -88,6 +177,7 @@ class TestSummaryGenerator(unittest.TestCase):
 
         self.assertEqual(summary, "Test summary")
         mock_model.invoke.assert_called_once()
+        self.assertIs(mock_model.invoke.call_args[0][0][0], SUMMARY_SYSTEM_MESSAGE)
 
     @patch('src.summary_generator.embeddings_model')
     @patch('src.summary_generator.similar_titles')
@@ -118,7 +208,7 @@ class TestSummaryGenerator(unittest.TestCase):
         self.assertEqual(result[0]['title'], "Same News")
         self.assertEqual(result[1]['title'], "Different News")
 
-    @patch('src.summary_generator.model')
+    @patch('src.summary_generator.ranking_model')
     def test_evaluate_story_importance(self, mock_model):
         news_items = [
             {
@@ -141,6 +231,12 @@ class TestSummaryGenerator(unittest.TestCase):
         # Check that the top item has the highest score and latest date
         self.assertEqual(result[0]['title'], 'News 10')  # Correct highest score item
 
+        # The instructions are a shared system message; only the human message names the category
+        system_message, human_message = mock_model.invoke.call_args[0][0]
+        self.assertIs(system_message, RANKING_SYSTEM_MESSAGE)
+        self.assertNotIn("Politics", system_message.content)
+        self.assertTrue(human_message.content.startswith("Kategorija: Politics\n"))
+
     @patch('src.summary_generator.embeddings_model')
     @patch('src.summary_generator.model')
     @patch('src.summary_generator.os.path.exists')
@@ -223,7 +319,7 @@ class TestSummaryGenerator(unittest.TestCase):
         self.assertEqual(deduplicate_news_items([]), [])
         self.assertEqual(evaluate_story_importance([], "Politics"), [])
 
-    @patch('src.summary_generator.model')
+    @patch('src.summary_generator.ranking_model')
     def test_evaluate_story_importance_error_cases(self, mock_model_param):
         news_items = [
             {
@@ -275,10 +371,43 @@ class TestSummaryGenerator(unittest.TestCase):
         v2 = [1, 1, 1]
         self.assertEqual(cosine_similarity(v1, v2), 0)
 
+    def test_find_title_candidates(self):
+        titles = [
+            "Seimas priėmė naują biudžeto įstatymą",
+            "Seimas priėmė naujo biudžeto įstatymą",
+            "Krepšinio rinktinė laimėjo draugiškas rungtynes",
+            "Trumpas",
+        ]
+        candidates = find_title_candidates([title.lower() for title in titles])
+        self.assertEqual(candidates[0], {1, 3})  # Near-duplicate plus the short title
+        self.assertNotIn(2, candidates[0])
+        self.assertEqual(candidates[3], set())
+
+    def test_deduplicate_news_items_matches_pairwise_comparison(self):
+        news_items = [
+            {"title": "Seimas priėmė naują biudžeto įstatymą"},
+            {"title": "Krepšinio rinktinė laimėjo draugiškas rungtynes"},
+            {"title": "SEIMAS PRIĖMĖ NAUJĄ BIUDŽETO ĮSTATYMĄ!"},
+            {"title": "Krepšinio rinktinė pralaimėjo draugiškas rungtynes"},
+            {"title": "Orai"},
+            {"title": "Orai."},
+        ]
+        result = deduplicate_news_items(news_items)
+        self.assertEqual(
+            [item['title'] for item in result],
+            ["Seimas priėmė naują biudžeto įstatymą", "Krepšinio rinktinė laimėjo draugiškas rungtynes", "Orai"]
+        )
+
     def test_similar_titles_edge_cases(self):
         self.assertTrue(similar_titles("Same Title", "same title"))
         self.assertFalse(similar_titles("Different", "Title"))
         self.assertTrue(similar_titles("Almost Same Title", "Almost Same Title!"))
+        self.assertTrue(similar_titles("", ""))
+
+    def test_similar_titles_threshold_is_exclusive(self):
+        # 2 * 4 matching characters / 10 characters = exactly 0.8
+        self.assertFalse(similar_titles("abcde", "abcdx"))
+        self.assertTrue(similar_titles("abcde", "abcdx", threshold=0.79))
 
     def test_evaluate_story_importance_invalid_response(self):
         news_items = [
@@ -296,7 +425,7 @@ class TestSummaryGenerator(unittest.TestCase):
             result = evaluate_story_importance(news_items, "Politics")
             self.assertEqual(len(result), 1)  # Should fall back to date-based sorting
 
-    @patch('src.summary_generator.model')
+    @patch('src.summary_generator.ranking_model')
     def test_evaluate_story_importance_empty_scores(self, mock_model):
         news_items = [
             {
@@ -312,7 +441,7 @@ class TestSummaryGenerator(unittest.TestCase):
         result = evaluate_story_importance(news_items, "Politics")
         self.assertEqual(len(result), 1)  # Should fall back to date-based sorting
 
-    @patch('src.summary_generator.model')
+    @patch('src.summary_generator.ranking_model')
     def test_evaluate_story_importance_exception(self, mock_model):
         news_items = [
             {
@@ -353,7 +482,7 @@ class TestSummaryGenerator(unittest.TestCase):
         # Verify results
         self.assertEqual(result, {})
 
-    @patch('src.summary_generator.model')
+    @patch('src.summary_generator.ranking_model')
     def test_evaluate_story_importance_min_max_stories(self, mock_model):
         # Test with fewer stories than min_stories
         news_items_few = [
@@ -390,6 +519,13 @@ class TestSummaryGenerator(unittest.TestCase):
         result = sort_by_category(news_items)
         self.assertEqual(result, {"Uncategorized": news_items})
 
+    def test_cosine_similarity_matrix_matches_pairwise(self):
+        embeddings = [[1, 0, 0], [0.5, 0.5, 0], [0, 0, 0], [0.2, 0.1, 0.9]]
+        matrix = cosine_similarity_matrix(embeddings)
+        for i, v1 in enumerate(embeddings):
+            for j, v2 in enumerate(embeddings):
+                self.assertAlmostEqual(float(matrix[i, j]), cosine_similarity(v1, v2), places=5)
+
     def test_cosine_similarity_empty_vectors(self):
         self.assertEqual(cosine_similarity([], []), 0)
 
@@ -401,7 +537,7 @@ class TestSummaryGenerator(unittest.TestCase):
             result = generate_summary([])
             self.assertEqual(result, "Empty summary")
 
-    @patch('src.summary_generator.model')
+    @patch('src.summary_generator.ranking_model')
     def test_evaluate_story_importance_empty_list(self, mock_model):
         result = evaluate_story_importance([], "Politics")
         self.assertEqual(result, [])
@@ -442,7 +578,26 @@ class TestSummaryGenerator(unittest.TestCase):
         result = deduplicate_news_items(news_items)
         self.assertEqual(len(result), 2)
 
-    @patch('src.summary_generator.model')
+    @patch('src.summary_generator.embeddings_model')
+    def test_deduplicate_news_items_semantic_uses_batched_embeddings(self, mock_embeddings_model):
+        news_items = [
+            {"title": "Seimas priėmė biudžetą", "ai_summary": "Longest summary"},
+            {"title": "Krepšinio rinktinė laimėjo", "ai_summary": "Medium"},
+            {"title": "Parlamentas patvirtino biudžetą", "ai_summary": "Short"},
+        ]
+        mock_embeddings_model.embed_documents.return_value = [
+            [1.0, 0.0, 0.0],
+            [0.0, 1.0, 0.0],
+            [0.9, 0.1, 0.0],  # Close to the first title
+        ]
+
+        result = deduplicate_news_items(news_items, use_semantic=True)
+
+        mock_embeddings_model.embed_documents.assert_called_once_with([item["title"] for item in news_items])
+        mock_embeddings_model.embed_query.assert_not_called()
+        self.assertEqual([item["title"] for item in result], ["Seimas priėmė biudžetą", "Krepšinio rinktinė laimėjo"])
+
+    @patch('src.summary_generator.ranking_model')
     def test_evaluate_story_importance_with_valid_scores(self, mock_model):
         news_items = [
             {
@@ -484,7 +639,7 @@ class TestSummaryGenerator(unittest.TestCase):
         mock_print.assert_any_call("\nCategory1\nSummary1")
         mock_print.assert_any_call("\nCategory2\nSummary2")
 
-    @patch('src.summary_generator.model')
+    @patch('src.summary_generator.ranking_model')
     def test_evaluate_story_importance_with_no_valid_scores(self, mock_model):
         news_items = [
             {
@@ -599,6 +754,32 @@ class TestSummaryGenerator(unittest.TestCase):
                 result = deduplicate_news_items(news_items)
                 self.assertEqual(len(result), 2)
 
+    @patch('src.summary_generator.generate_summary')
+    @patch('src.summary_generator.evaluate_story_importance')
+    def test_generate_summaries_by_category_isolates_failed_category(self, mock_evaluate_importance, mock_generate_summary):
+        news_items = [
+            {"title": "News 1", "category": "Politics"},
+            {"title": "Other 2", "category": "Technology"},
+            {"title": "Story 3", "category": "Sports"},
+        ]
+        mock_evaluate_importance.side_effect = lambda items, category: items
+        def summarize(items):
+            if items[0]["category"] == "Technology":
+                raise RuntimeError("rate limited")
+            return f"Summary of {items[0]['category']}"
+        mock_generate_summary.side_effect = summarize
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            with patch('src.summary_generator.load_config', return_value={"base_folder": temp_dir, "log_file": os.path.join(temp_dir, "test.log")}), \
+                 patch('src.summary_generator.setup_logging'), \
+                 patch('src.summary_generator.get_latest_json_file', return_value="news.json"), \
+                 patch('src.summary_generator.read_json_file', return_value=news_items), \
+                 patch('src.summary_generator.deduplicate_news_items', side_effect=lambda items: items):
+                summaries = generate_summaries_by_category("test_config.json")
+
+        self.assertEqual(list(summaries), ["Politics", "Sports"])
+        self.assertEqual(summaries["Sports"], "Summary of Sports")
+
     def test_generate_summaries_by_category_no_json_files(self):
         with patch('src.summary_generator.get_latest_json_file') as mock_get_latest_json_file:
             mock_get_latest_json_file.side_effect = FileNotFoundError("No JSON files found in the directory.")
@@ -615,7 +796,7 @@ class TestSummaryGenerator(unittest.TestCase):
                     logged_args = mock_logging.error.call_args[0]
                     self.assertIn("No JSON files found in the directory.", str(logged_args[0]))
 
-    @patch('src.summary_generator.model')
+    @patch('src.summary_generator.ranking_model')
     def test_evaluate_story_importance_missing_pub_date(self, mock_model):
         news_items = [
             {"title": "News 1", "description": "Description 1", "category": "Politics"},
@@ -3,7 +3,8 @@ import unittest
 import os
 import tempfile
 from unittest.mock import patch, mock_open, MagicMock
-from src.utils import setup_logging, load_config
+import src.utils
+from src.utils import setup_logging, load_config, load_env_once, atomic_write_bytes
 
 class TestUtils(unittest.TestCase):
     
@@ -35,7 +36,7 @@ class TestUtils(unittest.TestCase):
     def test_load_config_valid_json(self, mock_file):
         config_path = "config.json"
         config = load_config(config_path)
-        mock_file.assert_called_once_with(config_path, 'r')
+        mock_file.assert_called_once_with(config_path, 'rb')
         self.assertEqual(config, {"key": "value"})
 
     @patch("builtins.open", new_callable=mock_open)
@@ -49,5 +50,30 @@ class TestUtils(unittest.TestCase):
         with self.assertRaises(ValueError):
             load_config("invalid.json")
 
+    @patch.dict(os.environ, {}, clear=True)
+    @patch("src.utils.dotenv_values", return_value={"MAILGUN_DOMAIN": "mg.example.com", "EMPTY": None})
+    def test_load_env_once(self, mock_dotenv_values):
+        with patch.object(src.utils, "_env_values", None):
+            self.assertEqual(load_env_once(), {"MAILGUN_DOMAIN": "mg.example.com"})
+            self.assertEqual(load_env_once(), {"MAILGUN_DOMAIN": "mg.example.com"})
+            self.assertEqual(os.environ["MAILGUN_DOMAIN"], "mg.example.com")
+        mock_dotenv_values.assert_called_once()
+
+    def test_atomic_write_bytes(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, "news.json")
+            atomic_write_bytes(file_path, b"old")
+
+            with patch("src.utils.os.replace", side_effect=OSError("disk full")):
+                with self.assertRaises(OSError):
+                    atomic_write_bytes(file_path, b"new")
+            with open(file_path, "rb") as file:
+                self.assertEqual(file.read(), b"old")
+
+            atomic_write_bytes(file_path, b"new")
+            with open(file_path, "rb") as file:
+                self.assertEqual(file.read(), b"new")
+            self.assertEqual(os.listdir(temp_dir), ["news.json"])
+
 if __name__ == "__main__":
     unittest.main()